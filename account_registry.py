@@ -0,0 +1,310 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import Optional, Dict, Any, List, Set, Tuple
+
+log = logging.getLogger(__name__)
+
+class LinkedAccountRegistry:
+    """Linked accounts and their guild memberships held in memory, persisted to SQLite with batched writes"""
+
+    def __init__(self, path: str = "accounts.db", legacy_json_path: Optional[str] = None, flush_delay: float = 2.0,
+                 non_member_ttl: float = 7 * 24 * 3600):
+        self.path = path
+        # Old flat JSON file, imported once on first start
+        self.legacy_json_path = legacy_json_path
+        # Mutations within this window are written to disk together
+        self.flush_delay = flush_delay
+        # Seconds a "not a member of this guild" result is trusted before checking again
+        self.non_member_ttl = non_member_ttl
+        self._accounts: Dict[str, Dict[str, Any]] = {}
+        self._guild_members: Dict[str, Set[str]] = {}
+        # Reverse index: user_id -> guilds the user is known to be in
+        self._user_guilds: Dict[str, Set[str]] = {}
+        # Linked users without any known guild (e.g. migrated links), and per
+        # guild the ones of them that haven't been checked against it yet
+        self._unresolved: Set[str] = set()
+        self._to_check: Dict[str, Set[str]] = {}
+        # guild_id -> {user_id: unix time it was found not to be a member}
+        self._non_members: Dict[str, Dict[str, float]] = {}
+        # user_id -> (Discord name, unix time it was last seen)
+        self._display_names: Dict[str, Tuple[str, float]] = {}
+        # SQL statements not yet written, applied in one transaction per flush
+        self._pending: List[Tuple[str, Tuple]] = []
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # Created on first use so they bind to the bot's running loop
+        self._lock: Optional[asyncio.Lock] = None
+        self._write_lock: Optional[asyncio.Lock] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def _locks(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+            self._write_lock = asyncio.Lock()
+        return self._lock, self._write_lock
+
+    def load(self):
+        """Create the tables, migrate the legacy JSON file if needed and read everything into memory"""
+        with self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS accounts (
+                    user_id TEXT PRIMARY KEY,
+                    name    TEXT NOT NULL,
+                    tag     TEXT NOT NULL,
+                    region  TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS guild_members (
+                    guild_id TEXT NOT NULL,
+                    user_id  TEXT NOT NULL,
+                    PRIMARY KEY (guild_id, user_id)
+                );
+                CREATE INDEX IF NOT EXISTS idx_guild_members_user ON guild_members (user_id);
+                CREATE TABLE IF NOT EXISTS guild_non_members (
+                    guild_id   TEXT NOT NULL,
+                    user_id    TEXT NOT NULL,
+                    checked_at REAL NOT NULL,
+                    PRIMARY KEY (guild_id, user_id)
+                );
+                CREATE TABLE IF NOT EXISTS display_names (
+                    user_id    TEXT PRIMARY KEY,
+                    name       TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+            """)
+        self._migrate_legacy_json()
+
+        self._accounts = {
+            user_id: {"name": name, "tag": tag, "region": region}
+            for user_id, name, tag, region in self._conn.execute("SELECT user_id, name, tag, region FROM accounts")
+        }
+        self._guild_members = {}
+        self._user_guilds = {}
+        for guild_id, user_id in self._conn.execute("SELECT guild_id, user_id FROM guild_members"):
+            self._guild_members.setdefault(guild_id, set()).add(user_id)
+            self._user_guilds.setdefault(user_id, set()).add(guild_id)
+        self._unresolved = {user_id for user_id in self._accounts if user_id not in self._user_guilds}
+        self._to_check = {}
+        with self._conn:
+            self._conn.execute("DELETE FROM guild_non_members WHERE checked_at < ?", (time.time() - self.non_member_ttl,))
+        self._non_members = {}
+        for guild_id, user_id, checked_at in self._conn.execute("SELECT guild_id, user_id, checked_at FROM guild_non_members"):
+            self._non_members.setdefault(guild_id, {})[user_id] = checked_at
+        self._display_names = {
+            user_id: (name, updated_at)
+            for user_id, name, updated_at in self._conn.execute("SELECT user_id, name, updated_at FROM display_names")
+        }
+
+    def _migrate_legacy_json(self):
+        """One-shot import of linked_accounts.json; the file is renamed afterwards"""
+        if not self.legacy_json_path or not os.path.exists(self.legacy_json_path):
+            return
+        try:
+            with open(self.legacy_json_path, 'r') as f:
+                legacy = json.load(f)
+        except Exception as e:
+            log.error("Error loading linked accounts: %s", e)
+            return
+
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO accounts VALUES (?, ?, ?, ?)",
+                [
+                    (str(user_id), info.get("name"), info.get("tag"), info.get("region", "eu"))
+                    for user_id, info in legacy.items() if info.get("name") and info.get("tag")
+                ]
+            )
+        os.replace(self.legacy_json_path, self.legacy_json_path + ".migrated")
+        log.info("Migrated %d linked account(s) from %s", len(legacy), self.legacy_json_path)
+
+    def get(self, user_id) -> Optional[Dict[str, Any]]:
+        """Get the linked account of a Discord user (no disk I/O)"""
+        return self._accounts.get(str(user_id))
+
+    def all(self) -> Dict[str, Dict[str, Any]]:
+        """Snapshot of every linked account, keyed by Discord user id"""
+        return dict(self._accounts)
+
+    def for_guild(self, guild_id) -> Dict[str, Dict[str, Any]]:
+        """Linked accounts of one guild's members, keyed by Discord user id"""
+        members = self._guild_members.get(str(guild_id), ())
+        return {user_id: self._accounts[user_id] for user_id in members if user_id in self._accounts}
+
+    def unresolved_for(self, guild_id, limit: Optional[int] = None) -> List[str]:
+        """Linked users without a known guild that haven't been checked against this guild yet"""
+        guild_id = str(guild_id)
+        return list(itertools.islice(self._guild_to_check(guild_id), limit))
+
+    def _guild_to_check(self, guild_id: str) -> Set[str]:
+        to_check = self._to_check.get(guild_id)
+        if to_check is None:
+            # Skip users recently found not to be members (remembered across restarts)
+            cutoff = time.time() - self.non_member_ttl
+            known = {user_id for user_id, checked_at in self._non_members.get(guild_id, {}).items() if checked_at >= cutoff}
+            to_check = self._to_check[guild_id] = self._unresolved - known
+        return to_check
+
+    async def resolve_memberships(self, guild_id, members: List[str], non_members: List[str]):
+        """Record the outcome of checking unresolved users against a guild"""
+        guild_id = str(guild_id)
+        lock, _ = self._locks()
+        now = time.time()
+        async with lock:
+            to_check = self._guild_to_check(guild_id)
+            changed = False
+            for user_id in map(str, non_members):
+                to_check.discard(user_id)
+                if user_id in self._accounts:
+                    self._non_members.setdefault(guild_id, {})[user_id] = now
+                    self._pending.append(("INSERT OR REPLACE INTO guild_non_members VALUES (?, ?, ?)", (guild_id, user_id, now)))
+                    changed = True
+            for user_id in map(str, members):
+                to_check.discard(user_id)
+                if user_id in self._accounts and not self.is_member(guild_id, user_id):
+                    self._add_member(guild_id, user_id)
+                    changed = True
+            if changed:
+                self._schedule_flush()
+
+    def is_member(self, guild_id, user_id) -> bool:
+        return str(user_id) in self._guild_members.get(str(guild_id), ())
+
+    async def link(self, user_id, name: str, tag: str, region: str, guild_id=None):
+        """Link a Valorant account to a Discord user"""
+        user_id = str(user_id)
+        lock, _ = self._locks()
+        async with lock:
+            self._accounts[user_id] = {
+                "name": name,
+                "tag": tag,
+                "region": region
+            }
+            self._pending.append(("INSERT OR REPLACE INTO accounts VALUES (?, ?, ?, ?)", (user_id, name, tag, region)))
+            if guild_id is not None:
+                self._add_member(str(guild_id), user_id)
+            elif user_id not in self._user_guilds:
+                # Linked outside a server: find the guilds it belongs to later
+                self._unresolved.add(user_id)
+                for to_check in self._to_check.values():
+                    to_check.add(user_id)
+            self._schedule_flush()
+
+    async def unlink(self, user_id) -> Optional[Dict[str, Any]]:
+        """Remove a user's linked account and guild memberships; returns the removed account"""
+        user_id = str(user_id)
+        lock, _ = self._locks()
+        async with lock:
+            removed = self._accounts.pop(user_id, None)
+            if removed is not None:
+                for guild_id in self._user_guilds.pop(user_id, ()):
+                    self._guild_members[guild_id].discard(user_id)
+                if user_id in self._unresolved:
+                    self._unresolved.discard(user_id)
+                    for to_check in self._to_check.values():
+                        to_check.discard(user_id)
+                for non_members in self._non_members.values():
+                    non_members.pop(user_id, None)
+                self._pending.append(("DELETE FROM accounts WHERE user_id = ?", (user_id,)))
+                self._pending.append(("DELETE FROM guild_members WHERE user_id = ?", (user_id,)))
+                self._pending.append(("DELETE FROM guild_non_members WHERE user_id = ?", (user_id,)))
+                self._schedule_flush()
+            return removed
+
+    async def add_membership(self, guild_id, user_id):
+        """Record that a linked user is a member of a guild"""
+        guild_id, user_id = str(guild_id), str(user_id)
+        if user_id not in self._accounts or self.is_member(guild_id, user_id):
+            return
+        lock, _ = self._locks()
+        async with lock:
+            self._add_member(guild_id, user_id)
+            self._schedule_flush()
+
+    def get_display_name(self, user_id, max_age: float) -> Optional[str]:
+        """Cached Discord name of a user, or None if unknown or older than max_age seconds"""
+        cached = self._display_names.get(str(user_id))
+        if cached and time.time() - cached[1] < max_age:
+            return cached[0]
+        return None
+
+    async def set_display_names(self, names: Dict[str, str]):
+        """Remember Discord names; unchanged names are only re-stamped on disk once they age"""
+        now = time.time()
+        lock, _ = self._locks()
+        async with lock:
+            changed = False
+            for user_id, name in names.items():
+                user_id = str(user_id)
+                cached = self._display_names.get(user_id)
+                # Skip the write if the name is the same and was stamped within the last hour
+                if cached and cached[0] == name and now - cached[1] < 3600:
+                    continue
+                self._display_names[user_id] = (name, now)
+                self._pending.append(("INSERT OR REPLACE INTO display_names VALUES (?, ?, ?)", (user_id, name, now)))
+                changed = True
+            if changed:
+                self._schedule_flush()
+
+    def _add_member(self, guild_id: str, user_id: str):
+        self._guild_members.setdefault(guild_id, set()).add(user_id)
+        self._user_guilds.setdefault(user_id, set()).add(guild_id)
+        # Resolved users stay checkable by other guilds; only this guild is done
+        self._to_check.get(guild_id, set()).discard(user_id)
+        if self._non_members.get(guild_id, {}).pop(user_id, None) is not None:
+            self._pending.append(("DELETE FROM guild_non_members WHERE guild_id = ? AND user_id = ?", (guild_id, user_id)))
+        self._pending.append(("INSERT OR IGNORE INTO guild_members VALUES (?, ?)", (guild_id, user_id)))
+
+    def _schedule_flush(self):
+        if self._closed:
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def _flush_later(self):
+        # Keep going while mutations arrive during a write
+        while self._pending:
+            await asyncio.sleep(self.flush_delay)
+            # Shielded so close() can't interrupt a write that is already running
+            await asyncio.shield(self.flush())
+
+    async def flush(self):
+        """Write pending changes to disk now"""
+        lock, write_lock = self._locks()
+        # One write at a time, so statements are applied in order
+        async with write_lock:
+            async with lock:
+                pending, self._pending = self._pending, []
+            if not pending:
+                return
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self._write, pending)
+            except Exception as e:
+                log.error("Error saving linked accounts, retrying %d change(s) later: %s", len(pending), e)
+                # The transaction was rolled back: put the batch back in front of newer changes
+                async with lock:
+                    self._pending[:0] = pending
+                self._schedule_flush()
+
+    def _write(self, statements: List[Tuple[str, Tuple]]):
+        """Apply a batch of statements in a single (atomic) transaction"""
+        with self._conn:
+            for sql, args in statements:
+                self._conn.execute(sql, args)
+
+    async def close(self):
+        """Skip the flush delay, write everything now and close the database
+
+        A write that is already running is waited for (flush() takes the write
+        lock), so the connection is never used from two threads at once.
+        """
+        self._closed = True
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        await self.flush()
+        if self._pending:
+            log.error("Closing with %d unsaved linked account change(s)", len(self._pending))
+        self._conn.close()
@@ -0,0 +1,111 @@
+"""Minimal stand-ins for the discord.Interaction surface the command handlers use"""
+import itertools
+import time
+from typing import Optional, List, Dict, Any
+
+class FakeAsset:
+    def __init__(self, url: str):
+        self.url = url
+
+class FakeUser:
+    def __init__(self, user_id: int, name: str):
+        self.id = user_id
+        self.name = name
+        self.display_name = name
+        self.mention = f"<@{user_id}>"
+        self.display_avatar = FakeAsset(f"https://cdn.discordapp.com/embed/avatars/{user_id % 6}.png")
+
+class FakeGuild:
+    def __init__(self, guild_id: int):
+        self.id = guild_id
+        self.members: Dict[int, FakeUser] = {}
+
+    def add_member(self, user: FakeUser):
+        self.members[user.id] = user
+
+    def get_member(self, user_id: int) -> Optional[FakeUser]:
+        return self.members.get(user_id)
+
+    async def query_members(self, user_ids=None, cache=True) -> List[FakeUser]:
+        return [self.members[user_id] for user_id in user_ids or () if user_id in self.members]
+
+class FakePermissions:
+    def __init__(self, administrator: bool = False):
+        self.administrator = administrator
+
+class FakeMessage:
+    """A sent message; edits are recorded so partial replies can be checked"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, interaction: "FakeInteraction", payload: Dict[str, Any]):
+        self.id = next(self._ids)
+        self.interaction = interaction
+        self.payload = payload
+        self.edits: List[Dict[str, Any]] = []
+
+    async def edit(self, **payload):
+        self.edits.append(payload)
+        self.interaction.events.append(("edit", time.perf_counter(), payload))
+        return self
+
+class FakeResponse:
+    def __init__(self, interaction: "FakeInteraction"):
+        self.interaction = interaction
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def defer(self, ephemeral: bool = False, thinking: bool = False):
+        self._done = True
+        self.interaction.events.append(("defer", time.perf_counter(), {}))
+
+    async def send_message(self, content: Optional[str] = None, **payload):
+        self._done = True
+        payload["content"] = content
+        self.interaction.events.append(("response", time.perf_counter(), payload))
+
+class FakeFollowup:
+    def __init__(self, interaction: "FakeInteraction"):
+        self.interaction = interaction
+
+    async def send(self, content: Optional[str] = None, **payload) -> FakeMessage:
+        payload["content"] = content
+        self.interaction.events.append(("followup", time.perf_counter(), payload))
+        return FakeMessage(self.interaction, payload)
+
+class FakeInteraction:
+    """Records everything a handler sends instead of talking to Discord"""
+
+    def __init__(self, user: FakeUser, guild: Optional[FakeGuild] = None, administrator: bool = False):
+        self.user = user
+        self.guild = guild
+        self.guild_id = guild.id if guild else None
+        # The instrumentation falls back to the callback name
+        self.command = None
+        self.permissions = FakePermissions(administrator)
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+        # (kind, time.perf_counter(), payload) in the order they happened
+        self.events: List[tuple] = []
+
+    def replies(self) -> List[Dict[str, Any]]:
+        """Payloads of every message sent (not counting edits)"""
+        return [payload for kind, _, payload in self.events if kind in ("response", "followup")]
+
+    def first_reply_at(self) -> Optional[float]:
+        """time.perf_counter() of the first message sent, partial or not"""
+        for kind, at, _ in self.events:
+            if kind in ("response", "followup"):
+                return at
+        return None
+
+    def edited(self) -> bool:
+        """Whether a partial reply was completed by an edit"""
+        return any(kind == "edit" for kind, _, _ in self.events)
+
+    def failed(self) -> bool:
+        """Whether the handler answered with an error message"""
+        replies = self.replies()
+        return not replies or any((payload.get("content") or "").startswith("❌") for payload in replies)
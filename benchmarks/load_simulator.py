@@ -0,0 +1,286 @@
+"""Concurrent load test of the slash command handlers against the mock HenrikDev server
+
+Interactions arrive as a Poisson process from users spread over several guilds,
+at a sweep of arrival rates, to find where the bot stops keeping up:
+
+    python benchmarks/load_simulator.py --users 200 --guilds 30 --rates 5 10 20 40 --mix stats=0.7 leaderboard=0.3
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from typing import Dict, Any, List, Tuple
+
+from fake_discord import FakeGuild, FakeInteraction, FakeUser
+from mock_henrik import MockHenrikServer
+from run_benchmarks import COMMANDS, import_bot, percentile, reset_caches
+
+from metrics import Histogram, metrics
+
+# Discord drops an interaction that isn't acknowledged within 3 seconds
+ACK_DEADLINE = 3.0
+
+def parse_mix(items: List[str]) -> List[Tuple[str, float]]:
+    """["stats=0.7", "leaderboard=0.3"] -> [("stats", 0.7), ("leaderboard", 0.3)]"""
+    mix = []
+    for item in items:
+        command, _, weight = item.partition("=")
+        if command not in COMMANDS:
+            raise argparse.ArgumentTypeError(f"unknown command: {command}")
+        mix.append((command, float(weight or 1)))
+    return mix
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up a task that sleeps for a fixed interval"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - started - self.interval))
+
+    def start(self):
+        self.samples = []
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+def queue_wait_histogram() -> Histogram:
+    """Rate-limit queue waits of every lane merged into one histogram"""
+    merged = Histogram()
+    for histogram in metrics.histograms("valorant_queue_wait_seconds").values():
+        merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+        merged.count += histogram.count
+        merged.sum += histogram.sum
+    return merged
+
+def histogram_since(before: Histogram, after: Histogram) -> Histogram:
+    """Observations recorded between two snapshots"""
+    delta = Histogram(after.buckets)
+    delta.counts = [b - a for a, b in zip(before.counts, after.counts)]
+    delta.count = after.count - before.count
+    delta.sum = after.sum - before.sum
+    return delta
+
+def ms(seconds) -> float:
+    return round(seconds * 1000, 1) if seconds is not None else 0.0
+
+async def run_interaction(bot, command: str, user: FakeUser, guild: FakeGuild, scheduled: float) -> Dict[str, Any]:
+    """Run one command and time it from the moment it was due to arrive"""
+    started = time.perf_counter()
+    interaction = FakeInteraction(user, guild)
+    failed = False
+    try:
+        await getattr(bot, command).callback(interaction)
+        failed = interaction.failed()
+    except Exception:
+        failed = True
+    finished = time.perf_counter()
+    acked = interaction.events[0][1] if interaction.events else finished
+    return {
+        "command": command,
+        "start_delay": started - scheduled,
+        "ack": acked - scheduled,
+        "latency": finished - scheduled,
+        "failed": failed,
+        "finished": finished,
+    }
+
+async def run_step(bot, args, rate: float, users: List[Tuple[FakeUser, FakeGuild]], rng: random.Random) -> Dict[str, Any]:
+    """Offer Poisson arrivals at rate per second for args.duration seconds"""
+    if args.cache == "cold":
+        reset_caches(bot)
+    commands = [command for command, _ in args.mix]
+    weights = [weight for _, weight in args.mix]
+
+    # Arrival offsets from the start of the step, with exponential gaps
+    offsets = []
+    offset = rng.expovariate(rate)
+    while offset < args.duration:
+        offsets.append(offset)
+        offset += rng.expovariate(rate)
+
+    monitor = LoopLagMonitor()
+    waits_before = queue_wait_histogram()
+    requests_before = bot.valorant_api.upstream_requests
+    monitor.start()
+    step_started = time.perf_counter()
+    tasks = []
+    for offset in offsets:
+        scheduled = step_started + offset
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        # Overdue arrivals are launched right away but still timed from when they were due
+        user, guild = rng.choice(users)
+        command = rng.choices(commands, weights)[0]
+        tasks.append(asyncio.ensure_future(run_interaction(bot, command, user, guild, scheduled)))
+
+    done, pending = await asyncio.wait(tasks, timeout=args.duration + args.drain) if tasks else (set(), set())
+    for task in pending:
+        task.cancel()
+    await monitor.stop()
+
+    samples = [task.result() for task in done]
+    if not samples:
+        return {"rate": rate, "arrivals": len(offsets), "completed": 0, "timed_out": len(pending)}
+    elapsed = max(sample["finished"] for sample in samples) - step_started
+    latencies = [sample["latency"] for sample in samples]
+    acks = [sample["ack"] for sample in samples]
+    start_delays = [sample["start_delay"] for sample in samples]
+    errors = sum(sample["failed"] for sample in samples) + len(pending)
+    queue_waits = histogram_since(waits_before, queue_wait_histogram())
+    lag = monitor.samples or [0.0]
+
+    per_command = {}
+    for command in commands:
+        command_latencies = [sample["latency"] for sample in samples if sample["command"] == command]
+        if command_latencies:
+            per_command[command] = {
+                "completed": len(command_latencies),
+                "p50_ms": ms(percentile(command_latencies, 50)),
+                "p95_ms": ms(percentile(command_latencies, 95)),
+            }
+
+    return {
+        "rate": rate,
+        "arrivals": len(offsets),
+        "completed": len(samples),
+        "timed_out": len(pending),
+        "throughput": round(len(samples) / elapsed, 2),
+        "error_rate": round(errors / len(offsets), 4),
+        "late_acks": sum(ack > ACK_DEADLINE for ack in acks),
+        "latency_p50_ms": ms(percentile(latencies, 50)),
+        "latency_p95_ms": ms(percentile(latencies, 95)),
+        "latency_p99_ms": ms(percentile(latencies, 99)),
+        "ack_p95_ms": ms(percentile(acks, 95)),
+        "start_delay_p95_ms": ms(percentile(start_delays, 95)),
+        "queue_wait_p95_ms": ms(queue_waits.quantile(0.95)),
+        "loop_lag_p99_ms": ms(percentile(lag, 99)),
+        "loop_lag_max_ms": ms(max(lag)),
+        "upstream_calls": bot.valorant_api.upstream_requests - requests_before,
+        "commands": per_command,
+    }
+
+def keeps_up(step: Dict[str, Any], args) -> bool:
+    """Whether the bot handled a step: no drops, few errors and acknowledgements in time"""
+    return (
+        step["completed"] > 0
+        and not step["timed_out"]
+        and not step["late_acks"]
+        and step["error_rate"] <= args.max_error_rate
+        and step["latency_p95_ms"] <= args.max_p95
+    )
+
+async def simulate(args) -> Dict[str, Any]:
+    server = MockHenrikServer(latency=args.latency / 1000, jitter=args.jitter / 1000, rate_limit=args.rate_limit)
+    base_url = await server.start()
+
+    original_cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="valorant-load-")
+    bot = import_bot(workdir, args.rate_limit)
+    bot.valorant_api.base_url = base_url
+    rng = random.Random(args.seed)
+
+    # Every user is linked and a member of one guild
+    guilds = [FakeGuild(100000000000000001 + index) for index in range(args.guilds)]
+    users = []
+    for index in range(args.users):
+        user = FakeUser(200000000000000000 + index, f"load_user_{index}")
+        guild = guilds[index % len(guilds)]
+        guild.add_member(user)
+        users.append((user, guild))
+        await bot.linked_accounts.link(user.id, f"Load{index}", "EUW", "eu", guild_id=guild.id)
+
+    results: Dict[str, Any] = {"settings": vars(args), "steps": []}
+    try:
+        for rate in args.rates:
+            step = await run_step(bot, args, rate, users, rng)
+            step["keeps_up"] = keeps_up(step, args)
+            results["steps"].append(step)
+            print_step(step)
+            if not step["keeps_up"] and args.stop_on_saturation:
+                break
+    finally:
+        await bot.linked_accounts.close()
+        await bot.valorant_api.close()
+        await server.stop()
+        os.chdir(original_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    sustained = [step["rate"] for step in results["steps"] if step["keeps_up"]]
+    results["ceiling_per_second"] = max(sustained) if sustained else None
+    results["rate_limited"] = server.rate_limited
+    return results
+
+HEADER = (
+    f"{'rate/s':>8}{'done/s':>8}{'arrived':>9}{'err %':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+    f"{'ack p95':>9}{'start p95':>11}{'queue p95':>11}{'lag p99':>9}{'lag max':>9}  ok"
+)
+
+def print_step(step: Dict[str, Any]):
+    if not step["completed"]:
+        print(f"{step['rate']:>8g}  nothing completed ({step['arrivals']} arrivals, {step['timed_out']} timed out)")
+        return
+    print(
+        f"{step['rate']:>8g}{step['throughput']:>8g}{step['arrivals']:>9}{step['error_rate'] * 100:>7.1f}"
+        f"{step['latency_p50_ms']:>9}{step['latency_p95_ms']:>9}{step['latency_p99_ms']:>9}{step['ack_p95_ms']:>9}"
+        f"{step['start_delay_p95_ms']:>11}{step['queue_wait_p95_ms']:>11}{step['loop_lag_p99_ms']:>9}{step['loop_lag_max_ms']:>9}"
+        f"  {'yes' if step['keeps_up'] else 'NO'}"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the concurrency ceiling of the command handlers offline")
+    parser.add_argument("--users", type=int, default=200, help="linked users")
+    parser.add_argument("--guilds", type=int, default=30, help="guilds the users are spread over")
+    parser.add_argument("--mix", nargs="+", default=["stats=0.7", "leaderboard=0.3"], help="command=weight pairs")
+    parser.add_argument("--rates", nargs="+", type=float, default=[5, 10, 20, 40, 80], help="arrival rates per second to sweep")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of arrivals per rate")
+    parser.add_argument("--drain", type=float, default=30, help="extra seconds to let a step's interactions finish")
+    parser.add_argument("--latency", type=float, default=50, help="mean mock API latency in ms")
+    parser.add_argument("--jitter", type=float, default=10, help="mock API latency standard deviation in ms")
+    parser.add_argument("--rate-limit", type=int, default=0, help="mock API requests per minute (0 = unlimited)")
+    parser.add_argument("--cache", choices=("cold", "warm"), default="cold", help="clear in-memory caches before every rate")
+    parser.add_argument("--max-p95", type=float, default=2000, help="p95 latency in ms a rate must stay under")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="share of failed interactions a rate may have")
+    parser.add_argument("--stop-on-saturation", action="store_true", help="skip the remaining rates once one isn't sustained")
+    parser.add_argument("--seed", type=int, default=1, help="seed of the arrival process")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+    try:
+        args.mix = parse_mix(args.mix)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    # The simulator changes into a scratch directory
+    if args.json:
+        args.json = os.path.abspath(args.json)
+
+    print(f"{args.users} users in {args.guilds} guilds, mix {', '.join(f'{c}={w:g}' for c, w in args.mix)}, {args.duration:g}s per rate")
+    print(HEADER)
+    print("-" * len(HEADER))
+    results = asyncio.run(simulate(args))
+    print()
+    ceiling = results["ceiling_per_second"]
+    print(f"Highest sustained rate: {ceiling:g}/s" if ceiling is not None else "No rate was sustained")
+    if results["rate_limited"]:
+        print(f"Rate limited (429): {results['rate_limited']}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Local stand-in for the HenrikDev API, serving the recorded fixtures in benchmarks/fixtures
+
+Run it on its own to point a development bot at it:
+
+    python benchmarks/mock_henrik.py --port 8900 --latency 80
+"""
+import argparse
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import random
+import time
+from collections import Counter
+from aiohttp import web
+from typing import Optional, Dict, Any, List
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+def _load_fixture(fixtures_dir: str, name: str) -> Dict[str, Any]:
+    with open(os.path.join(fixtures_dir, name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _puuid(name: str, tag: str) -> str:
+    """Stable fake puuid for a Riot ID"""
+    digest = hashlib.md5(f"{name.lower()}#{tag.lower()}".encode("utf-8")).hexdigest()
+    return f"{digest[:8]}-{digest[8:12]}-{digest[12:16]}-{digest[16:20]}-{digest[20:32]}"
+
+class MockHenrikServer:
+    """Serves v1/account, v2/mmr, v1/mmr-history, and v3/matches with simulated latency and rate limits"""
+
+    def __init__(self, fixtures_dir: str = FIXTURES_DIR, latency: float = 0.05, jitter: float = 0.01,
+                 rate_limit: int = 0, matches_per_player: int = 10):
+        self.latency = latency
+        self.jitter = jitter
+        # Requests per minute before answering 429 (0 = unlimited)
+        self.rate_limit = rate_limit
+        self.matches_per_player = matches_per_player
+
+        self.account = _load_fixture(fixtures_dir, "account.json")
+        self.mmr = _load_fixture(fixtures_dir, "mmr.json")
+        self.mmr_history = _load_fixture(fixtures_dir, "mmr_history.json")
+        self.match = _load_fixture(fixtures_dir, "match.json")
+
+        self.requests: Counter = Counter()
+        self.rate_limited = 0
+        self._window_started = time.monotonic()
+        self._window_count = 0
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def total_requests(self) -> int:
+        return sum(self.requests.values())
+
+    def _match_ids(self, name: str, tag: str) -> List[str]:
+        """Newest-first match ids of a player, stable across calls"""
+        puuid = _puuid(name, tag)
+        ids = []
+        for index in range(self.matches_per_player):
+            match_id = f"{puuid[:8]}-{index:04d}-4000-8000-{puuid[-12:]}"
+            ids.append(match_id)
+        return ids
+
+    def _build_match(self, match_id: str, name: str, tag: str, index: int) -> Dict[str, Any]:
+        """The template match, re-labelled for one player and one point in time"""
+        match = copy.deepcopy(self.match)
+        metadata = match["metadata"]
+        metadata["matchid"] = match_id
+        metadata["game_start"] -= index * 3600
+
+        player = match["players"]["all_players"][0]
+        player.update({"name": name, "tag": tag, "puuid": _puuid(name, tag)})
+        # Alternate wins and losses
+        won = index % 2 == 0
+        match["teams"]["red"]["has_won"] = won
+        match["teams"]["blue"]["has_won"] = not won
+        return match
+
+    def _rate_limit_headers(self) -> Dict[str, str]:
+        if not self.rate_limit:
+            return {}
+        now = time.monotonic()
+        if now - self._window_started >= 60:
+            self._window_started = now
+            self._window_count = 0
+        return {
+            "x-ratelimit-limit": str(self.rate_limit),
+            "x-ratelimit-remaining": str(max(0, self.rate_limit - self._window_count)),
+            "x-ratelimit-reset": str(int(60 - (now - self._window_started)) + 1),
+        }
+
+    async def _respond(self, endpoint: str, build) -> web.Response:
+        self.requests[endpoint] += 1
+        await asyncio.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+
+        headers = self._rate_limit_headers()
+        if self.rate_limit and self._window_count >= self.rate_limit:
+            self.rate_limited += 1
+            headers["retry-after"] = headers["x-ratelimit-reset"]
+            body = {"status": 429, "errors": [{"code": 0, "message": "Rate limit reached", "status": 429}]}
+            return web.json_response(body, status=429, headers=headers)
+
+        self._window_count += 1
+        if self.rate_limit:
+            headers["x-ratelimit-remaining"] = str(max(0, self.rate_limit - self._window_count))
+        status, body = build()
+        return web.json_response(body, status=status, headers=headers)
+
+    async def handle_account(self, request: web.Request) -> web.Response:
+        name, tag = request.match_info["name"], request.match_info["tag"]
+
+        def build():
+            body = copy.deepcopy(self.account)
+            body["data"].update({"name": name, "tag": tag, "puuid": _puuid(name, tag)})
+            return 200, body
+        return await self._respond("v1/account", build)
+
+    async def handle_mmr(self, request: web.Request) -> web.Response:
+        name, tag = request.match_info["name"], request.match_info["tag"]
+
+        def build():
+            body = copy.deepcopy(self.mmr)
+            body["data"].update({"name": name, "tag": tag, "puuid": _puuid(name, tag)})
+            return 200, body
+        return await self._respond("v2/mmr", build)
+
+    async def handle_mmr_history(self, request: web.Request) -> web.Response:
+        name, tag = request.match_info["name"], request.match_info["tag"]
+
+        def build():
+            template = self.mmr_history["data"][0]
+            entries = []
+            for index, match_id in enumerate(self._match_ids(name, tag)):
+                entry = copy.deepcopy(template)
+                entry["match_id"] = match_id
+                entry["date_raw"] = template["date_raw"] - index * 3600
+                entry["mmr_change_to_last_game"] = 18 if index % 2 == 0 else -15
+                entries.append(entry)
+            return 200, {"status": 200, "name": name, "tag": tag, "data": entries}
+        return await self._respond("v1/mmr-history", build)
+
+    async def handle_matches(self, request: web.Request) -> web.Response:
+        name, tag = request.match_info["name"], request.match_info["tag"]
+        size = int(request.query.get("size", 5))
+
+        def build():
+            ids = self._match_ids(name, tag)[:size]
+            return 200, {"status": 200, "data": [self._build_match(match_id, name, tag, index) for index, match_id in enumerate(ids)]}
+        return await self._respond("v3/matches", build)
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/valorant/v1/account/{name}/{tag}", self.handle_account)
+        app.router.add_get("/valorant/v2/mmr/{region}/{name}/{tag}", self.handle_mmr)
+        app.router.add_get("/valorant/v1/mmr-history/{region}/{name}/{tag}", self.handle_mmr_history)
+        app.router.add_get("/valorant/v3/matches/{region}/{name}/{tag}", self.handle_matches)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving; returns the base URL to use instead of https://api.henrikdev.xyz/valorant"""
+        self._runner = web.AppRunner(self.make_app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        # Port 0 picks a free port, so read back the one that was bound
+        bound_host, bound_port = self._runner.addresses[0][:2]
+        return f"http://{bound_host}:{bound_port}/valorant"
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+async def _serve_forever(args):
+    server = MockHenrikServer(latency=args.latency / 1000, jitter=args.jitter / 1000, rate_limit=args.rate_limit)
+    base_url = await server.start(args.host, args.port)
+    print(f"Mock HenrikDev API listening on {base_url}")
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        await server.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve recorded HenrikDev fixtures locally")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=50, help="mean response latency in ms")
+    parser.add_argument("--jitter", type=float, default=10, help="latency standard deviation in ms")
+    parser.add_argument("--rate-limit", type=int, default=0, help="requests per minute before 429s (0 = unlimited)")
+    try:
+        asyncio.run(_serve_forever(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
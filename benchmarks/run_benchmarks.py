@@ -0,0 +1,192 @@
+"""Offline benchmark of the slash command handlers against the mock HenrikDev server
+
+No Discord connection, API key or network access is needed:
+
+    python benchmarks/run_benchmarks.py --iterations 50 --latency 80 --json results.json
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, Any, List
+
+from fake_discord import FakeGuild, FakeInteraction, FakeUser
+from mock_henrik import MockHenrikServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from transport import ReplayTransport
+
+COMMANDS = ("stats", "matches", "rank", "leaderboard")
+GUILD_ID = 100000000000000001
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+def import_bot(workdir: str, rate_limit: int):
+    """Import bot.py with its databases in workdir and nothing pointed at real services"""
+    os.environ.update({
+        "VALORANT_API_KEY": "benchmark",
+        "VALORANT_RATE_LIMIT": str(rate_limit or 100000),
+        "MATCH_STORE_PATH": os.path.join(workdir, "matches.db"),
+        "ACCOUNTS_DB_PATH": os.path.join(workdir, "accounts.db"),
+    })
+    # bot.py migrates ./linked_accounts.json on import, so run from the scratch directory
+    os.chdir(workdir)
+    return importlib.import_module("bot")
+
+def reset_caches(bot):
+    """Forget everything held in memory; the match and account databases are kept"""
+    bot.valorant_api.cache.discard(lambda key: True)
+    bot.leaderboard_snapshot.entries.clear()
+    bot.leaderboard_snapshot.attempted_at.clear()
+    bot.leaderboard_snapshot.rows = []
+
+async def run_command(bot, command: str, user: FakeUser, guild: FakeGuild) -> FakeInteraction:
+    interaction = FakeInteraction(user, guild)
+    # Linked users omit name/tag, which is the common case in production
+    await getattr(bot, command).callback(interaction)
+    return interaction
+
+async def benchmark(args) -> Dict[str, Any]:
+    server = MockHenrikServer(latency=args.latency / 1000, jitter=args.jitter / 1000, rate_limit=args.rate_limit)
+    base_url = await server.start()
+
+    original_cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="valorant-bench-")
+    bot = import_bot(workdir, args.rate_limit)
+    api = bot.valorant_api
+    if args.replay:
+        # Recorded production responses instead of the mock server
+        api.transport = ReplayTransport(args.replay)
+    else:
+        api.base_url = base_url
+
+    # Riot IDs to link: the ones the cassettes were recorded for, or generated ones
+    riot_ids = [riot_id.split("#", 1) for riot_id in args.accounts] if args.accounts else [
+        (f"Bench{index}", "EUW") for index in range(args.players)
+    ]
+    guild = FakeGuild(GUILD_ID)
+    users = []
+    for index, (name, tag) in enumerate(riot_ids):
+        user = FakeUser(200000000000000000 + index, f"bench_user_{index}")
+        guild.add_member(user)
+        users.append(user)
+        await bot.linked_accounts.link(user.id, name, tag, args.region, guild_id=guild.id)
+
+    results: Dict[str, Any] = {"settings": vars(args), "commands": {}}
+    tracemalloc.start()
+    try:
+        for command in args.commands:
+            latencies = []
+            # Until the first (possibly partial) reply, which is what users wait for
+            reply_latencies = []
+            partial = 0
+            errors = 0
+            requests_before = api.upstream_requests
+            if hasattr(tracemalloc, "reset_peak"):  # Python 3.9+
+                tracemalloc.reset_peak()
+
+            for iteration in range(args.iterations):
+                if args.cache == "cold":
+                    reset_caches(bot)
+                user = users[iteration % len(users)]
+                started = time.perf_counter()
+                interaction = await run_command(bot, command, user, guild)
+                finished = time.perf_counter()
+                latencies.append((finished - started) * 1000)
+                reply_latencies.append(((interaction.first_reply_at() or finished) - started) * 1000)
+                partial += interaction.edited()
+                errors += interaction.failed()
+
+            results["commands"][command] = {
+                "iterations": args.iterations,
+                "errors": errors,
+                "p50_ms": round(percentile(latencies, 50), 1),
+                "p95_ms": round(percentile(latencies, 95), 1),
+                "p99_ms": round(percentile(latencies, 99), 1),
+                "max_ms": round(max(latencies), 1),
+                "first_reply_p50_ms": round(percentile(reply_latencies, 50), 1),
+                "first_reply_p95_ms": round(percentile(reply_latencies, 95), 1),
+                "partial_replies": partial,
+                "upstream_calls": api.upstream_requests - requests_before,
+                "upstream_calls_per_run": round((api.upstream_requests - requests_before) / args.iterations, 2),
+                "peak_memory_kb": round(tracemalloc.get_traced_memory()[1] / 1024, 1),
+            }
+    finally:
+        tracemalloc.stop()
+        await bot.linked_accounts.close()
+        await api.close()
+        await server.stop()
+        os.chdir(original_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results["upstream_by_endpoint"] = dict(server.requests)
+    results["rate_limited"] = server.rate_limited
+    if args.replay:
+        results["replay"] = {"hits": api.transport.hits, "misses": api.transport.misses}
+    return results
+
+def print_report(results: Dict[str, Any]):
+    header = (
+        f"{'command':<12}{'runs':>6}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+        f"{'reply p95':>11}{'partial':>9}{'calls/run':>11}{'peak KB':>10}"
+    )
+    print(header)
+    print("-" * len(header))
+    for command, row in results["commands"].items():
+        print(
+            f"{command:<12}{row['iterations']:>6}{row['errors']:>5}{row['p50_ms']:>10}{row['p95_ms']:>10}"
+            f"{row['p99_ms']:>10}{row['first_reply_p95_ms']:>11}{row['partial_replies']:>9}"
+            f"{row['upstream_calls_per_run']:>11}{row['peak_memory_kb']:>10}"
+        )
+    print()
+    if "replay" in results:
+        print(f"Replayed responses: {results['replay']['hits']}, missing cassettes: {results['replay']['misses']}")
+    else:
+        print("Upstream requests:", ", ".join(f"{endpoint} {count}" for endpoint, count in sorted(results["upstream_by_endpoint"].items())))
+    if results["rate_limited"]:
+        print(f"Rate limited (429): {results['rate_limited']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the bot's command handlers offline")
+    parser.add_argument("--commands", nargs="+", choices=COMMANDS, default=list(COMMANDS))
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--players", type=int, default=20, help="linked accounts in the fake guild")
+    parser.add_argument("--latency", type=float, default=50, help="mean mock API latency in ms")
+    parser.add_argument("--jitter", type=float, default=10, help="mock API latency standard deviation in ms")
+    parser.add_argument("--rate-limit", type=int, default=0, help="mock API requests per minute (0 = unlimited)")
+    parser.add_argument("--cache", choices=("cold", "warm"), default="cold", help="clear in-memory caches before every run")
+    parser.add_argument("--replay", help="serve responses from this cassette directory instead of the mock server")
+    parser.add_argument("--accounts", nargs="+", help="Riot IDs (name#tag) to link, e.g. the ones the cassettes were recorded for")
+    parser.add_argument("--region", default="eu", help="region of the linked accounts")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+    # The benchmark changes into a scratch directory
+    if args.json:
+        args.json = os.path.abspath(args.json)
+    if args.replay:
+        args.replay = os.path.abspath(args.replay)
+
+    results = asyncio.run(benchmark(args))
+    print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    failed = sum(row["errors"] for row in results["commands"].values())
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
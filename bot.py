@@ -1,25 +1,121 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
+import functools
 import os
-import json
+import asyncio
+import logging
+import math
+import random
+import time
+from datetime import datetime, timezone
 from dotenv import load_dotenv
-from valorant_api import ValorantAPI
+from valorant_api import ValorantAPI, PRIORITY_LEADERBOARD, PRIORITY_BACKGROUND
+from match_store import MatchStore
+from account_registry import LinkedAccountRegistry
+from metrics import metrics
+from tracing import tracer, setup_logging
 
 # Load environment variables
 load_dotenv()
 
+log = logging.getLogger("bot")
+
 # Bot setup
 intents = discord.Intents.default()
 intents.message_content = True
-bot = commands.Bot(command_prefix='/', intents=intents)
 
 # Initialize Valorant API
-valorant_api = ValorantAPI(os.getenv('VALORANT_API_KEY'))
+valorant_api = ValorantAPI(
+    os.getenv('VALORANT_API_KEY'),
+    requests_per_minute=int(os.getenv('VALORANT_RATE_LIMIT', 30)),
+    match_store=MatchStore(os.getenv('MATCH_STORE_PATH', 'matches.db')),
+    # "record" saves every API response to VALORANT_CASSETTE_DIR, "replay" serves them offline
+    transport_mode=os.getenv('VALORANT_TRANSPORT', 'passthrough'),
+    cassette_dir=os.getenv('VALORANT_CASSETTE_DIR', 'cassettes'),
+    # Abort a request after API_TIMEOUT seconds; answer from an expired cached
+    # copy if upstream hasn't answered within API_STALE_DEADLINE seconds
+    request_timeout=float(os.getenv('API_TIMEOUT', 10)),
+    stale_deadline=float(os.getenv('API_STALE_DEADLINE', 0.75)),
+    # Stop calling an endpoint for CIRCUIT_BREAKER_RESET seconds after
+    # CIRCUIT_BREAKER_FAILURES failed requests in a row
+    breaker_failures=int(os.getenv('CIRCUIT_BREAKER_FAILURES', 5)),
+    breaker_reset=float(os.getenv('CIRCUIT_BREAKER_RESET', 30))
+)
+
+class ValorantBot(commands.Bot):
+    async def setup_hook(self):
+        # Keep the leaderboard snapshot warm in the background
+        refresh_leaderboard_snapshot.start()
+        if PREFETCH_BUDGET_SHARE > 0:
+            prefetch_linked_players.start()
+            watch_linked_matches.start()
+        # Local Prometheus-style metrics endpoint
+        self.metrics_runner = None
+        if METRICS_PORT:
+            self.metrics_runner = await metrics.start_server(METRICS_HOST, METRICS_PORT)
+
+    async def close(self):
+        refresh_leaderboard_snapshot.cancel()
+        prefetch_linked_players.cancel()
+        watch_linked_matches.cancel()
+        # Write any pending account changes before exiting
+        await linked_accounts.close()
+        # Release the shared HenrikDev connection pool on shutdown
+        await valorant_api.close()
+        if getattr(self, "metrics_runner", None) is not None:
+            await self.metrics_runner.cleanup()
+        await super().close()
+
+bot = ValorantBot(command_prefix='/', intents=intents)
 
 # Default region (can be changed)
 DEFAULT_REGION = "eu"
 
+# How many linked accounts /leaderboard fetches at the same time
+LEADERBOARD_CONCURRENCY = int(os.getenv('LEADERBOARD_CONCURRENCY', 8))
+
+# Seconds a Discord name fetched over REST is reused before asking again
+DISPLAY_NAME_TTL = 24 * 3600
+
+# Links without a known guild checked per /leaderboard, and across all guilds per refresh tick
+MEMBER_RESOLVE_BATCH = 100
+
+# Seconds before a leaderboard row is considered stale and re-fetched
+LEADERBOARD_MAX_AGE = int(os.getenv('LEADERBOARD_MAX_AGE', 300))
+# How often the background refresher wakes up to refresh a batch of stale rows
+LEADERBOARD_REFRESH_INTERVAL = 15
+
+# Share of the upstream rate budget the background warmer may spend (0 disables it)
+PREFETCH_BUDGET_SHARE = float(os.getenv('PREFETCH_BUDGET_SHARE', 0.25))
+# Seconds between warm-ups of one active linked player (jittered)
+PREFETCH_INTERVAL = int(os.getenv('PREFETCH_INTERVAL', 60))
+# Linked players are kept warm for this long after their last command
+PREFETCH_ACTIVE_WINDOW = 2 * 3600
+# How often the warmer wakes up
+PREFETCH_TICK = 10
+
+# Seconds between RR history polls of a linked player while they're playing
+MATCH_WATCH_MIN_INTERVAL = int(os.getenv('MATCH_WATCH_MIN_INTERVAL', 120))
+# Polls of idle players back off exponentially up to this many seconds
+MATCH_WATCH_MAX_INTERVAL = int(os.getenv('MATCH_WATCH_MAX_INTERVAL', 3600))
+# How often the match watcher wakes up
+MATCH_WATCH_TICK = 10
+
+# Port of the local /metrics endpoint (0 disables it)
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+
+# Log verbosity (DEBUG shows per-request details)
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+# Sampled per-interaction traces, written as JSON lines (empty path disables them)
+TRACE_FILE = os.getenv('TRACE_FILE', 'traces.jsonl')
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', 0.05))
+
+# Seconds a command waits for optional data (playercard, act name, RR history)
+# before replying without it; the reply is edited once it arrives (0 = always wait)
+COMMAND_LATENCY_BUDGET = float(os.getenv('COMMAND_LATENCY_BUDGET', 1.0))
+
 def get_rank_color(tier: int) -> int:
     if tier >= 27:  # Radiant
         return 0xFFFF85  # Bright yellow/gold
@@ -42,41 +138,179 @@ def get_rank_color(tier: int) -> int:
     else:  # Unranked
         return 0x5865F2  # Discord blue
 
+API_UNAVAILABLE_MESSAGE = "❌ The Henrik Dev API isn't responding right now. Please try again in a minute."
+
+def stale_footer(text, bundle):
+    """Footer text, marked with the data's age if an old copy was served during an API outage"""
+    return as_of_footer(text, bundle.stale_as_of)
+
+def as_of_footer(text, stale_as_of):
+    """Footer text with an "as of" mark for data stored at stale_as_of (unix time), if any"""
+    if stale_as_of is None:
+        return text
+    return f"{text} • ⚠️ as of {time.strftime('%d %b %H:%M UTC', time.gmtime(stale_as_of))}"
+
+async def send_reply(interaction, bundle, shown=None, **payload):
+    """Send a command's reply; returns the message if it has to be edited once pending data arrives
+
+    shown names the parts a later edit would add (default: all); other pending parts don't make the reply partial.
+    """
+    partial = any(part in bundle.pending for part in (shown or bundle.pending))
+    if partial:
+        metrics.inc("discord_partial_replies_total", command=interaction.command.name if interaction.command else "unknown")
+    with tracer.span("discord.followup", partial=partial):
+        message = await interaction.followup.send(wait=partial, **payload)
+    return message if partial else None
+
+async def edit_reply(message, **payload):
+    """Replace a partial reply with the complete one"""
+    try:
+        with tracer.span("discord.edit"):
+            await message.edit(**payload)
+    except discord.HTTPException as e:
+        log.warning("Could not complete partial reply: %s", e)
+
+def instrumented(func):
+    """Record latency and outcome of a slash command, and trace it"""
+    @functools.wraps(func)
+    async def wrapper(interaction: discord.Interaction, *args, **kwargs):
+        command = interaction.command.name if interaction.command else func.__name__
+        started = time.monotonic()
+        outcome = "ok"
+        try:
+            with tracer.trace(f"/{command}", command=command, user_id=interaction.user.id, guild_id=interaction.guild_id):
+                return await func(interaction, *args, **kwargs)
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            metrics.observe("discord_command_duration_seconds", time.monotonic() - started, command=command)
+            metrics.inc("discord_commands_total", command=command, outcome=outcome)
+    return wrapper
+
 # Account linking functions
+# Legacy JSON storage, migrated into the SQLite account store on first start
 LINKED_ACCOUNTS_FILE = "linked_accounts.json"
 
-def load_linked_accounts():
-    #""Load linked accounts from JSON file""
-    try:
-        if os.path.exists(LINKED_ACCOUNTS_FILE):
-            with open(LINKED_ACCOUNTS_FILE, 'r') as f:
-                return json.load(f)
-    except Exception as e:
-        print(f"Error loading linked accounts: {e}")
-    return {}
+linked_accounts = LinkedAccountRegistry(
+    os.getenv('ACCOUNTS_DB_PATH', 'accounts.db'),
+    legacy_json_path=LINKED_ACCOUNTS_FILE
+)
+linked_accounts.load()
 
-def save_linked_accounts(accounts):
-    #""Save linked accounts to JSON file""
-    try:
-        with open(LINKED_ACCOUNTS_FILE, 'w') as f:
-            json.dump(accounts, f, indent=2)
-    except Exception as e:
-        print(f"Error saving linked accounts: {e}")
+def load_linked_accounts():
+    """All linked accounts (served from memory)"""
+    return linked_accounts.all()
 
 def get_linked_account(user_id):
     """Get linked account for a Discord user"""
-    accounts = load_linked_accounts()
-    return accounts.get(str(user_id))
-
-def link_account(user_id, name, tag, region):
-    #""Link a Valorant account to a Discord user""
-    accounts = load_linked_accounts()
-    accounts[str(user_id)] = {
-        "name": name,
-        "tag": tag,
-        "region": region
-    }
-    save_linked_accounts(accounts)
+    return linked_accounts.get(user_id)
+
+async def remember_guild_member(interaction: discord.Interaction):
+    """Record that the invoking linked user belongs to this guild"""
+    if interaction.guild_id is not None and get_linked_account(interaction.user.id):
+        await linked_accounts.add_membership(interaction.guild_id, interaction.user.id)
+
+async def resolve_guild_memberships(guild, limit=MEMBER_RESOLVE_BATCH):
+    """Check a batch of links without a known guild (e.g. migrated from the JSON file) against one guild
+
+    Returns how many users were checked.
+    """
+    user_ids = linked_accounts.unresolved_for(guild.id, limit=limit)
+    if not user_ids:
+        return 0
+
+    members, non_members = [], []
+    if bot.intents.members:
+        # One gateway request for the whole batch
+        try:
+            found = await guild.query_members(user_ids=[int(user_id) for user_id in user_ids], cache=True)
+        except asyncio.TimeoutError:
+            return len(user_ids)
+        found_ids = {str(member.id) for member in found}
+        members = [user_id for user_id in user_ids if user_id in found_ids]
+        non_members = [user_id for user_id in user_ids if user_id not in found_ids]
+    else:
+        # Without the members intent the member cache is nearly empty, so ask the API
+        semaphore = asyncio.Semaphore(LEADERBOARD_CONCURRENCY)
+
+        async def check(user_id):
+            if guild.get_member(int(user_id)):
+                members.append(user_id)
+                return
+            async with semaphore:
+                try:
+                    await guild.fetch_member(int(user_id))
+                    members.append(user_id)
+                except discord.NotFound:
+                    non_members.append(user_id)
+                except discord.HTTPException as e:
+                    # Left unchecked, so it is tried again next time
+                    log.warning("Error checking member %s of guild %s: %s", user_id, guild.id, e)
+
+        await asyncio.gather(*(check(user_id) for user_id in user_ids))
+
+    await linked_accounts.resolve_memberships(guild.id, members, non_members)
+    return len(user_ids)
+
+async def load_guild_accounts(guild: discord.Guild):
+    """Linked accounts of one guild's members"""
+    await resolve_guild_memberships(guild)
+    return linked_accounts.for_guild(guild.id)
+
+async def fetch_display_names(guild, user_ids):
+    """Look up Discord names the caches don't know, with as few requests as possible"""
+    names = {}
+    if guild is not None and bot.intents.members:
+        # One gateway request per 100 members instead of one REST call each
+        for i in range(0, len(user_ids), 100):
+            try:
+                members = await guild.query_members(user_ids=[int(user_id) for user_id in user_ids[i:i + 100]], cache=True)
+            except asyncio.TimeoutError:
+                continue
+            names.update({str(member.id): member.name for member in members})
+
+    missing = [user_id for user_id in user_ids if user_id not in names]
+    if missing:
+        semaphore = asyncio.Semaphore(LEADERBOARD_CONCURRENCY)
+
+        async def fetch(user_id):
+            async with semaphore:
+                try:
+                    user = await bot.fetch_user(int(user_id))
+                    names[user_id] = user.name
+                except discord.HTTPException as e:
+                    log.warning("Error fetching Discord user %s: %s", user_id, e)
+
+        await asyncio.gather(*(fetch(user_id) for user_id in missing))
+    return names
+
+async def resolve_display_names(guild, user_ids):
+    """Discord names by user id: gateway cache, then persistent name cache, then batched lookups"""
+    names = {}
+    seen = {}
+    misses = []
+    for user_id in user_ids:
+        user = (guild.get_member(int(user_id)) if guild else None) or bot.get_user(int(user_id))
+        if user:
+            names[user_id] = seen[user_id] = user.name
+            continue
+
+        cached = linked_accounts.get_display_name(user_id, DISPLAY_NAME_TTL)
+        if cached:
+            names[user_id] = cached
+        else:
+            misses.append(user_id)
+
+    if misses:
+        fetched = await fetch_display_names(guild, misses)
+        names.update(fetched)
+        seen.update(fetched)
+
+    # Keep the persistent cache warm for the next restart
+    if seen:
+        await linked_accounts.set_display_names(seen)
+    return names
 
 @bot.event
 async def on_ready():
@@ -97,6 +331,7 @@ async def on_ready():
         print(f'❌ Error syncing commands: {e}')
 
 @bot.tree.command(name="help", description="Shows all available commands with descriptions")
+@instrumented
 async def help_command(interaction: discord.Interaction):
     embed = discord.Embed(
         title="📖 Valorant Stats Bot - Commands",
@@ -167,6 +402,7 @@ async def help_command(interaction: discord.Interaction):
     tag="Riot ID Tag (e.g., EUW)",
     region="Region (eu, na, ap, kr) - optional, defaults to EU"
 )
+@instrumented
 async def linkacc(interaction: discord.Interaction, name: str, tag: str, region: str = None):
     try:
         # Use default region if not specified
@@ -174,7 +410,7 @@ async def linkacc(interaction: discord.Interaction, name: str, tag: str, region:
             region = DEFAULT_REGION
 
         # Verify account exists
-        account_data = valorant_api.get_account(name, tag)
+        account_data = await valorant_api.get_account(name, tag)
 
         if not account_data or account_data.get("status") != 200:
             await interaction.response.send_message(
@@ -184,7 +420,7 @@ async def linkacc(interaction: discord.Interaction, name: str, tag: str, region:
             return
 
         # Link the account
-        link_account(interaction.user.id, name, tag, region)
+        await linked_accounts.link(interaction.user.id, name, tag, region, guild_id=interaction.guild_id)
 
         embed = discord.Embed(
             title="✅ Account Linked Successfully!",
@@ -216,6 +452,7 @@ async def linkacc(interaction: discord.Interaction, name: str, tag: str, region:
         )
 
 @bot.tree.command(name="unlinkacc", description="Unlink your Valorant account")
+@instrumented
 async def unlinkacc(interaction: discord.Interaction):
     try:
         # Check if account is linked
@@ -229,9 +466,7 @@ async def unlinkacc(interaction: discord.Interaction):
             return
 
         # Remove the linked account
-        accounts = load_linked_accounts()
-        del accounts[str(interaction.user.id)]
-        save_linked_accounts(accounts)
+        await linked_accounts.unlink(interaction.user.id)
 
         embed = discord.Embed(
             title="✅ Account Unlinked Successfully!",
@@ -256,20 +491,56 @@ async def unlinkacc(interaction: discord.Interaction):
             ephemeral=True
         )
 
+def decorate_stats_embed(embed, bundle, name, tag, total_matches, avatar_url):
+    """Set the parts of a /stats embed that come from the MMR and account documents
+
+    Parts still pending are left out: no act name, the default icon and no playercard.
+    """
+    mmr_data = bundle.mmr
+    account_data = bundle.account
+
+    # Current act name from the MMR document (more reliable)
+    current_act = None if "mmr" in bundle.pending else bundle.season_name
+    embed.title = f"**{name}#{tag}** • **{current_act}**" if current_act else f"**{name}#{tag}**"
+
+    #Rank icon
+    rank_icon_url = "https://i.imgur.com/JkNS0Xu.png"  # Default Valorant logo
+    if mmr_data and mmr_data.get("status") == 200:
+        current_data = mmr_data.get("data", {}).get("current_data", {})
+        rank_icon = current_data.get("images", {}).get("small")
+        if rank_icon:
+            rank_icon_url = rank_icon
+
+    embed.set_thumbnail(url=rank_icon_url)
+
+    # Add playercard as image if available
+    if account_data and account_data.get("status") == 200:
+        card_data = account_data.get("data", {}).get("card", {})
+        playercard_url = card_data.get("wide") or card_data.get("large")
+        if playercard_url:
+            embed.set_image(url=playercard_url)
+
+    # Footer
+    footer = f"Stats from the last {total_matches} matches" + (f" in {current_act}" if current_act else "")
+    embed.set_footer(text=stale_footer(footer, bundle), icon_url=avatar_url)
+
 @bot.tree.command(name="stats", description="Shows an overview of stats from the last 10 Ranked matches")
 @app_commands.describe(
     name="Riot ID Name (optional if account is linked)",
     tag="Riot ID Tag (optional if account is linked)",
     region="Region (eu, na, ap, kr)"
 )
+@instrumented
 async def stats(interaction: discord.Interaction, name: str = None, tag: str = None, region: str = None):
     await interaction.response.defer()
+    await remember_guild_member(interaction)
 
     try:
         # Check for linked account if name/tag not provided
         if not name or not tag:
             linked = get_linked_account(interaction.user.id)
             if linked:
+                note_linked_use(interaction.user.id)
                 name = name or linked.get("name")
                 tag = tag or linked.get("tag")
                 region = region or linked.get("region", DEFAULT_REGION)
@@ -283,58 +554,50 @@ async def stats(interaction: discord.Interaction, name: str = None, tag: str = N
         # Use default region if not specified
         if not region:
             region = DEFAULT_REGION
-        # Get account information for playercard
-        print(f"DEBUG: Fetching account for {name}#{tag}")
-        account_data = valorant_api.get_account(name, tag)
+        # Get account (playercard), MMR (rank icon, act name) and current-act
+        # matches in one concurrent round-trip; only the matches are essential
+        log.debug("Fetching account, MMR and matches for %s#%s in region %s", name, tag, region)
+        bundle = await valorant_api.get_player_bundle(
+            region, name, tag, include=("account", "mmr", "matches"),
+            essential=("matches",), budget=COMMAND_LATENCY_BUDGET or None
+        )
+        account_data = bundle.account
 
-        if not account_data:
-            await interaction.followup.send(f"❌ Account **{name}#{tag}** not found.\n*Tip: Pay attention to capitalization and correct spelling.*")
+        if "matches" in bundle.errors:
+            await interaction.followup.send(API_UNAVAILABLE_MESSAGE)
             return
 
-        if account_data.get("status") != 200:
-            error_msg = account_data.get("errors", [{}])[0].get("message", "Unknown error")
-            await interaction.followup.send(f"❌ Error retrieving account information: {error_msg}")
+        # Only a real 404 stops the command; an account that is pending, failed or
+        # hit an upstream error just leaves out the playercard
+        if account_data and account_data.get("status") == 404:
+            await interaction.followup.send(f"❌ Account **{name}#{tag}** not found.\n*Tip: Pay attention to capitalization and correct spelling.*")
             return
 
-        # Get MMR data for rank icon
-        mmr_data = valorant_api.get_mmr(region, name, tag)
-
-        # Get last 10 matches from current act
-        print(f"DEBUG: Fetching matches for {name}#{tag} in region {region}")
-
-        act_matches = valorant_api.get_all_act_matches(region, name, tag, mode="competitive")
+        act_matches = bundle.matches
 
-        if not act_matches:
+        if act_matches is None:
             await interaction.followup.send(f"❌ Player **{name}#{tag}** not found or no data available.")
             return
 
-        if act_matches.get("status") != 200:
-            await interaction.followup.send(f"❌ Error retrieving data.")
-            return
-
-        total_in_act = len(act_matches.get("data", [])) if act_matches else 0
-        print(f"DEBUG: Retrieved {total_in_act} matches from current act for {name}#{tag}")
+        log.debug("Retrieved %d matches from current act for %s#%s", len(act_matches), name, tag)
 
-        if not act_matches.get("data"):
+        if not act_matches:
             await interaction.followup.send(f"❌ No matches in current act found for **{name}#{tag}**.")
             return
 
         # Calculate stats from the 10 matches
-        stats_data = valorant_api.calculate_stats(act_matches, name, tag)
+        stats_data = valorant_api.calculate_stats(act_matches, name, tag, bundle.puuid)
 
         if not stats_data:
             await interaction.followup.send(f"❌ No statistics found for **{name}#{tag}**.")
             return
 
         total_matches = stats_data.get('matches', 0)
-        print(f"DEBUG: Calculated stats from {total_matches} matches")
-
-        # Get current act name from MMR API (more reliable)
-        current_act = valorant_api.get_current_season_name(region, name, tag)
+        log.debug("Calculated stats from %s matches", total_matches)
 
+        embed_started = time.perf_counter()
         # Create embed with card-style layout
         embed = discord.Embed(
-            title=f"**{name}#{tag}** • **{current_act}**",
             description=f"📊 Stats overview last ** 10 matches **in ranked",
             color=0x5865F2  # discord color
         )
@@ -383,50 +646,56 @@ async def stats(interaction: discord.Interaction, name: str = None, tag: str = N
 
         embed.add_field(name="\u200b", value="\u200b", inline=True)
 
-        #Rank icon
-        rank_icon_url = "https://i.imgur.com/JkNS0Xu.png"  # Default Valorant logo
-        if mmr_data and mmr_data.get("status") == 200:
-            current_data = mmr_data.get("data", {}).get("current_data", {})
-            rank_icon = current_data.get("images", {}).get("small")
-            if rank_icon:
-                rank_icon_url = rank_icon
-
-        embed.set_thumbnail(url=rank_icon_url)
-
-        # Add playercard as image if available
-        if account_data and account_data.get("status") == 200:
-            card_data = account_data.get("data", {}).get("card", {})
-            playercard_url = card_data.get("wide") or card_data.get("large")
-            if playercard_url:
-                embed.set_image(url=playercard_url)
-
-        # Footer
-        embed.set_footer(
-            text=f"Stats from the last {total_matches} matches in {current_act}",
-            icon_url=interaction.user.display_avatar.url
-        )
+        # Title, rank icon, playercard and footer (whatever of them has arrived)
+        decorate_stats_embed(embed, bundle, name, tag, total_matches, interaction.user.display_avatar.url)
 
         embed.timestamp = discord.utils.utcnow()
+        tracer.record("embed.build", embed_started)
+
+        message = await send_reply(interaction, bundle, embed=embed)
 
-        await interaction.followup.send(embed=embed)
+        if message is not None:
+            await valorant_api.complete_bundle(bundle)
+            decorate_stats_embed(embed, bundle, name, tag, total_matches, interaction.user.display_avatar.url)
+            await edit_reply(message, embed=embed)
 
     except Exception as e:
         await interaction.followup.send(f"❌ Error retrieving statistics: {str(e)}")
 
+def add_rr_change_field(match_embed, rr_history, match_id):
+    """Add a match's RR change after the placement field, if the RR history has it"""
+    # Per-match RR changes, answered from the local series
+    rr_change = rr_history.change_for_match(match_id) if rr_history else None
+    if rr_change is None:
+        return
+
+    rr_sign = "+" if rr_change >= 0 else ""
+    rr_color = "🟢" if rr_change >= 0 else "🔴"
+    # K/D/A, headshots, spacer and placement come first
+    match_embed.insert_field_at(
+        4,
+        name="📈 RR Change",
+        value=f"**{rr_color} {rr_sign}{rr_change}**",
+        inline=True
+    )
+
 @bot.tree.command(name="matches", description="Shows the last 10 ranked matches with detailed stats")
 @app_commands.describe(
     name="Riot ID Name (optional if account is linked)",
     tag="Riot ID Tag (optional if account is linked)",
     region="Region (eu, na, ap, kr)"
 )
+@instrumented
 async def matches(interaction: discord.Interaction, name: str = None, tag: str = None, region: str = None):
     await interaction.response.defer()
+    await remember_guild_member(interaction)
 
     try:
         # Check for linked account if name/tag not provided
         if not name or not tag:
             linked = get_linked_account(interaction.user.id)
             if linked:
+                note_linked_use(interaction.user.id)
                 name = name or linked.get("name")
                 tag = tag or linked.get("tag")
                 region = region or linked.get("region", DEFAULT_REGION)
@@ -440,63 +709,50 @@ async def matches(interaction: discord.Interaction, name: str = None, tag: str =
         # Use default region if not specified
         if not region:
             region = DEFAULT_REGION
-        # Get last 10 matches from current act
-        act_matches = valorant_api.get_all_act_matches(region, name, tag, mode="competitive")
+        # Get current-act matches, account (puuid) and RR history concurrently;
+        # the match sync's mmr-history probe and the RR history share one request.
+        # Only the matches are essential: players are also found by Riot ID,
+        # and RR changes are added once they arrive
+        bundle = await valorant_api.get_player_bundle(
+            region, name, tag, include=("matches", "account", "rr_history"),
+            essential=("matches",), budget=COMMAND_LATENCY_BUDGET or None
+        )
+        act_matches = bundle.matches
+
+        if "matches" in bundle.errors:
+            await interaction.followup.send(API_UNAVAILABLE_MESSAGE)
+            return
 
-        if not act_matches or act_matches.get("status") != 200:
+        if act_matches is None:
             await interaction.followup.send(f"❌ No matches found for **{name}#{tag}**.")
             return
 
-        if not act_matches.get("data"):
+        if not act_matches:
             await interaction.followup.send(f"❌ No matches found in current act for **{name}#{tag}**.")
             return
 
-        # Get MMR History for RR changes
-        import requests
-        mmr_history_url = f"{valorant_api.base_url}/v1/mmr-history/{region}/{name}/{tag}"
-        mmr_response = requests.get(mmr_history_url, headers=valorant_api.headers)
-
-        rr_changes_map = {}  # Map match_id to RR change
-        if mmr_response.status_code == 200:
-            mmr_history_data = mmr_response.json()
-            if mmr_history_data.get("status") == 200:
-                history = mmr_history_data.get("data", [])
-                for match in history:
-                    match_id = match.get("match_id")
-                    rr_change = match.get("mmr_change_to_last_game", 0)
-                    if match_id:
-                        rr_changes_map[match_id] = rr_change
+        # Match rows are indexed by puuid, which also survives Riot ID changes
+        puuid = bundle.puuid
 
         # Limit to 10 matches (Discord allows max 10 embeds per message)
-        matches_to_show = act_matches["data"][:10]
+        matches_to_show = act_matches[:10]
 
+        embed_started = time.perf_counter()
         # Create list of embeds - one per match
         embeds = []
+        # Matches shown, by embed, to add RR changes that arrive later
+        shown_matches = []
 
         for idx, match in enumerate(matches_to_show, 1):
             # Find player in match
-            player_stats = None
-            players = match.get("players", {}).get("all_players", [])
-            for player in players:
-                if player.get("name", "").lower() == name.lower() and player.get("tag", "").lower() == tag.lower():
-                    player_stats = player
-                    break
+            player_stats = match.find_player(name, tag, puuid)
 
             if not player_stats:
                 continue
 
             # Determine if won
-            team = player_stats.get("team", "").lower()
-            won = False
-            red_rounds = match.get("teams", {}).get("red", {}).get("rounds_won", 0)
-            blue_rounds = match.get("teams", {}).get("blue", {}).get("rounds_won", 0)
-
-            if team == "red":
-                won = match.get("teams", {}).get("red", {}).get("has_won", False)
-                player_score = f"{red_rounds}-{blue_rounds}"
-            else:
-                won = match.get("teams", {}).get("blue", {}).get("has_won", False)
-                player_score = f"{blue_rounds}-{red_rounds}"
+            won = match.won(player_stats.team)
+            player_score = match.score_line(player_stats.team)
 
             # Result text and color
             result_text = f"Win {player_score}" if won else f"Loss {player_score}"
@@ -506,7 +762,7 @@ async def matches(interaction: discord.Interaction, name: str = None, tag: str =
             from datetime import datetime
             import re
 
-            match_date = match.get("metadata", {}).get("game_start_patched", "Unknown date")
+            match_date = match.game_start_patched
 
             # Convert to 24h format
             if match_date != "Unknown date":
@@ -530,34 +786,22 @@ async def matches(interaction: discord.Interaction, name: str = None, tag: str =
                     pass  # Keep original if conversion fails
 
             # Map and agent
-            map_name = match.get("metadata", {}).get("map", "Unknown")
-            agent = player_stats.get("character", "Unknown")
+            map_name = match.map
+            agent = player_stats.character
 
             # Calculate stats
-            stats = player_stats.get("stats", {})
-            kills = stats.get("kills", 0)
-            deaths = stats.get("deaths", 0)
-            assists = stats.get("assists", 0)
+            kills = player_stats.kills
+            deaths = player_stats.deaths
+            assists = player_stats.assists
 
             # Calculate headshot percentage for this match
-            headshots = stats.get("headshots", 0)
-            bodyshots = stats.get("bodyshots", 0)
-            legshots = stats.get("legshots", 0)
-            total_shots = headshots + bodyshots + legshots
-            hs_percent = round((headshots / max(total_shots, 1)) * 100, 1)
+            hs_percent = round((player_stats.headshots / max(player_stats.total_shots, 1)) * 100, 1)
 
             # Get lobby placement (leaderboard position based on score)
-            # Sort all players by score to find placement
-            all_players = match.get("players", {}).get("all_players", [])
-            sorted_players = sorted(all_players, key=lambda p: p.get("stats", {}).get("score", 0), reverse=True)
-            lobby_placement = 1
-            for i, p in enumerate(sorted_players, 1):
-                if p.get("name", "").lower() == name.lower() and p.get("tag", "").lower() == tag.lower():
-                    lobby_placement = i
-                    break
+            lobby_placement = player_stats.placement
 
             # Get agent icon
-            agent_icon_url = player_stats.get("assets", {}).get("agent", {}).get("small")
+            agent_icon_url = player_stats.agent_icon
 
             # Get map image - construct URL from map name
             # Valorant API map images format
@@ -612,40 +856,385 @@ async def matches(interaction: discord.Interaction, name: str = None, tag: str =
             )
 
             # Get RR change for this match
-            match_id = match.get("metadata", {}).get("matchid")
-            rr_change = rr_changes_map.get(match_id, None)
-
-            if rr_change is not None:
-                rr_sign = "+" if rr_change >= 0 else ""
-                rr_color = "🟢" if rr_change >= 0 else "🔴"
-                match_embed.add_field(
-                    name="📈 RR Change",
-                    value=f"**{rr_color} {rr_sign}{rr_change}**",
-                    inline=True
-                )
+            add_rr_change_field(match_embed, bundle.rr_history, match.match_id)
 
             match_embed.add_field(name="\u200b", value="\u200b", inline=True)
 
             match_embed.set_footer(text=f"{match_date}")
 
             embeds.append(match_embed)
+            shown_matches.append(match)
+
+        tracer.record("embed.build", embed_started, embeds=len(embeds))
 
         # Send all embeds at once (max 10)
         if embeds:
-            await interaction.followup.send(embeds=embeds)
+            # The last embed carries the age note if old data was served
+            footer = embeds[-1].footer.text
+            embeds[-1].set_footer(text=stale_footer(footer, bundle))
+            # A late account only refines the player lookup; late RR changes are shown
+            message = await send_reply(interaction, bundle, shown=("rr_history",), embeds=embeds)
+
+            if message is not None:
+                await valorant_api.complete_bundle(bundle)
+                for match_embed, match in zip(embeds, shown_matches):
+                    add_rr_change_field(match_embed, bundle.rr_history, match.match_id)
+                embeds[-1].set_footer(text=stale_footer(footer, bundle))
+                await edit_reply(message, embeds=embeds)
         else:
             await interaction.followup.send(f"❌ No match data found for **{name}#{tag}**.")
 
     except Exception as e:
         await interaction.followup.send(f"❌ Error retrieving matches: {str(e)}")
 
-@bot.tree.command(name="leaderboard", description="Shows a leaderboard of all linked accounts sorted by rank")
+async def fetch_leaderboard_row(user_id, account_info, lane=PRIORITY_LEADERBOARD, fresh=False):
+    """Fetch one leaderboard row; returns None if the account can't be resolved"""
+    name = account_info.get("name")
+    tag = account_info.get("tag")
+    region = account_info.get("region", DEFAULT_REGION)
+
+    try:
+        # Get MMR data (behind interactive commands in the rate limit queue)
+        with valorant_api.priority(lane), valorant_api.track_staleness() as stale:
+            mmr_data = await valorant_api.get_mmr(region, name, tag, fresh=fresh)
+    except Exception as e:
+        log.warning("Error fetching data for %s#%s: %s", name, tag, e)
+        return None
+    if not mmr_data or mmr_data.get("status") != 200:
+        return None
+
+    current_data = mmr_data.get("data", {}).get("current_data", {})
+    return {
+        "user_id": user_id,
+        "valorant_name": f"{name}#{tag}",
+        "tier": current_data.get("currenttier", 0),
+        "rank": current_data.get("currenttierpatched", "Unranked"),
+        "rr": current_data.get("ranking_in_tier", 0),
+        "elo": current_data.get("elo", 0),
+        # Unix time the MMR document was fetched; an expired copy served during an outage keeps its own
+        "fetched_at": min(stale) if stale else time.time(),
+        "stale": bool(stale),
+    }
+
+async def fetch_leaderboard_entry(user_id, account_info, semaphore, lane=PRIORITY_LEADERBOARD):
+    """Fetch one leaderboard row with at most LEADERBOARD_CONCURRENCY fetches at a time"""
+    async with semaphore:
+        return await fetch_leaderboard_row(user_id, account_info, lane)
+
+class LeaderboardSnapshot:
+    """Pre-sorted leaderboard rows kept up to date by a background task"""
+
+    def __init__(self, max_age):
+        self.max_age = max_age
+        self.entries = {}       # user_id -> leaderboard row
+        self.attempted_at = {}  # user_id -> time.monotonic() of last fetch attempt
+        self.rows = []          # entries sorted by tier, then RR
+
+    def missing(self, accounts):
+        """User ids that have never been fetched"""
+        return [user_id for user_id in accounts if user_id not in self.attempted_at]
+
+    def stale(self, accounts, limit=None):
+        """User ids whose rows are older than max_age, stalest first"""
+        now = time.monotonic()
+        stale = [user_id for user_id in accounts if now - self.attempted_at.get(user_id, -math.inf) >= self.max_age]
+        stale.sort(key=lambda user_id: self.attempted_at.get(user_id, -math.inf))
+        return stale[:limit] if limit is not None else stale
+
+    async def refresh(self, accounts, user_ids, lane=PRIORITY_LEADERBOARD):
+        """Re-fetch the given accounts and re-sort the snapshot"""
+        semaphore = asyncio.Semaphore(LEADERBOARD_CONCURRENCY)
+        results = await asyncio.gather(
+            *(fetch_leaderboard_entry(user_id, accounts[user_id], semaphore, lane) for user_id in user_ids)
+        )
+
+        now = time.monotonic()
+        for user_id, entry in zip(user_ids, results):
+            self.attempted_at[user_id] = now
+            self._store(user_id, entry)
+        self._sort()
+
+    def update(self, user_id, entry):
+        """Replace one row with one the caller has already fetched"""
+        self.attempted_at[user_id] = time.monotonic()
+        self._store(user_id, entry)
+        self._sort()
+
+    def _store(self, user_id, entry):
+        # Keep the previous row if the refresh failed or only found an older copy
+        previous = self.entries.get(user_id)
+        if entry and (previous is None or entry["fetched_at"] >= previous["fetched_at"]):
+            self.entries[user_id] = entry
+
+    def prune(self, accounts):
+        """Drop accounts that were unlinked in the meantime"""
+        removed = [user_id for user_id in self.entries if user_id not in accounts]
+        for user_id in removed:
+            del self.entries[user_id]
+            self.attempted_at.pop(user_id, None)
+        if removed:
+            self._sort()
+
+    def _sort(self):
+        self.rows = sorted(self.entries.values(), key=lambda x: (x["tier"], x["rr"]), reverse=True)
+
+    def rows_for(self, accounts):
+        """Sorted rows restricted to the given accounts (e.g. one guild's)"""
+        return [row for row in self.rows if row["user_id"] in accounts]
+
+leaderboard_snapshot = LeaderboardSnapshot(LEADERBOARD_MAX_AGE)
+
+@tasks.loop(seconds=LEADERBOARD_REFRESH_INTERVAL)
+async def refresh_leaderboard_snapshot():
+    """Refresh a small batch of stale rows per tick so refreshes are spread out"""
+    try:
+        # Match links without a known guild to the servers they're in, one batch of checks per tick
+        checked = 0
+        for guild in bot.guilds:
+            if checked >= MEMBER_RESOLVE_BATCH:
+                break
+            checked += await resolve_guild_memberships(guild, limit=MEMBER_RESOLVE_BATCH - checked)
+
+        accounts = load_linked_accounts()
+        leaderboard_snapshot.prune(accounts)
+        if not accounts:
+            return
+
+        # Enough rows per tick to cycle every account once per max_age
+        batch_size = math.ceil(len(accounts) * LEADERBOARD_REFRESH_INTERVAL / LEADERBOARD_MAX_AGE)
+        stale = leaderboard_snapshot.stale(accounts, limit=batch_size)
+        if stale:
+            await leaderboard_snapshot.refresh(accounts, stale, lane=PRIORITY_BACKGROUND)
+    except Exception as e:
+        log.exception("Error refreshing leaderboard snapshot: %s", e)
+
+@refresh_leaderboard_snapshot.before_loop
+async def before_refresh_leaderboard_snapshot():
+    await bot.wait_until_ready()
+
+class RequestBudget:
+    """Share of the upstream rate limit that background tasks may spend"""
+
+    def __init__(self, share):
+        self.share = share
+        self.allowance = 0.0  # upstream requests that may still be sent
+        self._updated = time.monotonic()
+
+    def available(self):
+        """Whether at least one more request fits in the budget"""
+        now = time.monotonic()
+        budget = valorant_api.scheduler.capacity * self.share
+        # At most one minute's share can be saved up for a burst
+        self.allowance = min(budget, self.allowance + budget * (now - self._updated) / 60.0)
+        self._updated = now
+        return self.allowance >= 1
+
+    async def spend(self, awaitable):
+        """Await an API call and charge the requests it actually sent upstream"""
+        # Cache hits cost nothing (concurrent commands can inflate the count, which errs on the safe side)
+        sent_before = valorant_api.upstream_requests
+        try:
+            return await awaitable
+        finally:
+            self.allowance -= valorant_api.upstream_requests - sent_before
+
+background_budget = RequestBudget(PREFETCH_BUDGET_SHARE)
+
+class LinkedPlayerWarmer:
+    """Keeps recently active linked players' data cached ahead of their next command"""
+
+    def __init__(self, interval, active_window, budget, jitter=0.2):
+        self.interval = interval
+        self.active_window = active_window
+        self.budget = budget
+        self.jitter = jitter
+        self.last_used = {}   # user_id -> time.monotonic() of the last command on their linked account
+        self.next_due = {}    # user_id -> time.monotonic() of the next warm-up
+        self.warmed = 0
+
+    def _next_time(self):
+        # Jitter so players used at the same moment don't refresh in lockstep
+        return time.monotonic() + self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def record_use(self, user_id):
+        """Note that a user just ran a command on their linked account"""
+        user_id = str(user_id)
+        self.last_used[user_id] = time.monotonic()
+        # The command itself has just refreshed the cache
+        self.next_due[user_id] = self._next_time()
+
+    def due(self, accounts):
+        """Active linked players due for a warm-up, most recently active first"""
+        now = time.monotonic()
+        expired = [
+            user_id for user_id, used in self.last_used.items()
+            if now - used > self.active_window or user_id not in accounts
+        ]
+        for user_id in expired:
+            del self.last_used[user_id]
+            self.next_due.pop(user_id, None)
+
+        due = [user_id for user_id in self.last_used if self.next_due.get(user_id, 0) <= now]
+        due.sort(key=lambda user_id: self.last_used[user_id], reverse=True)
+        return due
+
+    async def run_once(self, accounts):
+        """Warm due players one at a time while the background budget allows"""
+        for user_id in self.due(accounts):
+            if not self.budget.available():
+                break
+            account = accounts[user_id]
+            with valorant_api.priority(PRIORITY_BACKGROUND):
+                await self.budget.spend(valorant_api.get_player_bundle(
+                    account.get("region", DEFAULT_REGION), account.get("name"), account.get("tag"),
+                    include=("account", "mmr", "rr_history", "matches")
+                ))
+            self.next_due[user_id] = self._next_time()
+            self.warmed += 1
+
+player_warmer = LinkedPlayerWarmer(PREFETCH_INTERVAL, PREFETCH_ACTIVE_WINDOW, background_budget)
+
+@tasks.loop(seconds=PREFETCH_TICK)
+async def prefetch_linked_players():
+    """Refresh MMR, RR history and recent matches of active linked players"""
+    try:
+        await player_warmer.run_once(load_linked_accounts())
+    except Exception as e:
+        log.exception("Error prefetching linked players: %s", e)
+
+@prefetch_linked_players.before_loop
+async def before_prefetch_linked_players():
+    await bot.wait_until_ready()
+
+class MatchWatcher:
+    """Polls linked players' RR history and ingests a match as soon as it shows up"""
+
+    def __init__(self, min_interval, max_interval, budget, jitter=0.2):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.budget = budget
+        self.jitter = jitter
+        # user_id -> {"interval": seconds, "next_poll": time.monotonic(), "head": newest known match id}
+        self.players = {}
+        self.detected = 0
+
+    def _schedule(self, state):
+        state["next_poll"] = time.monotonic() + state["interval"] * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def mark_active(self, user_id):
+        """Poll a player at the fastest rate again, e.g. after they used a command"""
+        state = self.players.get(str(user_id))
+        if state and state["interval"] > self.min_interval:
+            state["interval"] = self.min_interval
+            self._schedule(state)
+
+    def due(self, accounts):
+        """Linked players whose next poll is due, most overdue first"""
+        now = time.monotonic()
+        for user_id in [user_id for user_id in self.players if user_id not in accounts]:
+            del self.players[user_id]
+        for user_id in accounts:
+            if user_id not in self.players:
+                # Spread the first polls out instead of probing everyone at once
+                self.players[user_id] = {
+                    "interval": self.min_interval,
+                    "next_poll": now + random.uniform(0, self.min_interval),
+                    "head": None,
+                }
+
+        due = [user_id for user_id, state in self.players.items() if state["next_poll"] <= now]
+        due.sort(key=lambda user_id: self.players[user_id]["next_poll"])
+        return due
+
+    async def poll(self, user_id, account):
+        """Check one player for a new match; speed up on activity, back off while idle"""
+        region = account.get("region", DEFAULT_REGION)
+        name, tag = account.get("name"), account.get("tag")
+        state = self.players[user_id]
+
+        with valorant_api.priority(PRIORITY_BACKGROUND):
+            history = await self.budget.spend(valorant_api.get_rr_history(region, name, tag))
+        latest = history.latest(1) if history else []
+        head = latest[0].match_id if latest else None
+
+        if head and state["head"] is not None and head != state["head"]:
+            self.detected += 1
+            log.info("New match %s for %s#%s, ingesting", head, name, tag)
+            await self.budget.spend(self.ingest(user_id, account))
+            # Another game is likely to follow, so keep polling fast
+            state["interval"] = self.min_interval
+        else:
+            state["interval"] = min(state["interval"] * 2, self.max_interval)
+
+        if head:
+            state["head"] = head
+        self._schedule(state)
+
+    async def ingest(self, user_id, account):
+        """Pull a player's new match and current MMR into the cache, store and leaderboard"""
+        region = account.get("region", DEFAULT_REGION)
+        name, tag = account.get("name"), account.get("tag")
+        # Cached MMR and match lists predate the match that just finished
+        valorant_api.invalidate_player(region, name, tag)
+        with valorant_api.priority(PRIORITY_BACKGROUND):
+            # Wait for the post-match MMR rather than taking the expired copy
+            entry, _ = await asyncio.gather(
+                fetch_leaderboard_row(user_id, account, PRIORITY_BACKGROUND, fresh=True),
+                valorant_api.get_all_act_matches(region, name, tag, mode="competitive"),
+            )
+        leaderboard_snapshot.update(user_id, entry)
+
+    async def run_once(self, accounts):
+        """Poll due players one at a time while the background budget allows"""
+        for user_id in self.due(accounts):
+            if not self.budget.available():
+                break
+            try:
+                await self.poll(user_id, accounts[user_id])
+            except Exception as e:
+                # Likely an upstream outage: back off this player and carry on with the rest
+                state = self.players[user_id]
+                state["interval"] = min(state["interval"] * 2, self.max_interval)
+                self._schedule(state)
+                log.warning("Error polling %s#%s for new matches: %s", accounts[user_id].get("name"), accounts[user_id].get("tag"), e)
+
+match_watcher = MatchWatcher(MATCH_WATCH_MIN_INTERVAL, MATCH_WATCH_MAX_INTERVAL, background_budget)
+
+metrics.gauge("bot_prefetch_warmed", lambda: player_warmer.warmed, "Linked players warmed by the background prefetcher")
+metrics.gauge("bot_watched_players", lambda: len(match_watcher.players), "Linked players polled for new matches")
+metrics.gauge("bot_new_matches_detected", lambda: match_watcher.detected, "Finished matches detected by the match watcher")
+metrics.gauge("bot_background_budget", lambda: background_budget.allowance, "Upstream requests background tasks may still send")
+
+def note_linked_use(user_id):
+    """A user ran a command on their linked account: keep their data warm and watch closely"""
+    player_warmer.record_use(user_id)
+    match_watcher.mark_active(user_id)
+
+@tasks.loop(seconds=MATCH_WATCH_TICK)
+async def watch_linked_matches():
+    """Detect finished matches of linked players and ingest them right away"""
+    try:
+        await match_watcher.run_once(load_linked_accounts())
+    except Exception as e:
+        log.exception("Error watching linked players' matches: %s", e)
+
+@watch_linked_matches.before_loop
+async def before_watch_linked_matches():
+    await bot.wait_until_ready()
+
+@bot.tree.command(name="leaderboard", description="Shows a leaderboard of this server's linked accounts sorted by rank")
+@instrumented
 async def leaderboard(interaction: discord.Interaction):
+    if interaction.guild is None:
+        await interaction.response.send_message("❌ Leaderboards are only available in servers.", ephemeral=True)
+        return
+
     await interaction.response.defer()
 
     try:
-        # Load all linked accounts
-        accounts = load_linked_accounts()
+        # Load the linked accounts of this server's members
+        await remember_guild_member(interaction)
+        accounts = await load_guild_accounts(interaction.guild)
 
         if not accounts:
             await interaction.followup.send(
@@ -654,41 +1243,11 @@ async def leaderboard(interaction: discord.Interaction):
             )
             return
 
-        # Fetch rank data for all linked accounts
-        leaderboard_data = []
-
-        for user_id, account_info in accounts.items():
-            name = account_info.get("name")
-            tag = account_info.get("tag")
-            region = account_info.get("region", DEFAULT_REGION)
-
-            try:
-                # Get Discord user
-                user = await bot.fetch_user(int(user_id))
-                discord_name = user.name if user else "Unknown"
-
-                # Get MMR data
-                mmr_data = valorant_api.get_mmr(region, name, tag)
-
-                if mmr_data and mmr_data.get("status") == 200:
-                    current_data = mmr_data.get("data", {}).get("current_data", {})
-
-                    tier = current_data.get("currenttier", 0)
-                    rank = current_data.get("currenttierpatched", "Unranked")
-                    rr = current_data.get("ranking_in_tier", 0)
-                    elo = current_data.get("elo", 0)
-
-                    leaderboard_data.append({
-                        "discord_name": discord_name,
-                        "valorant_name": f"{name}#{tag}",
-                        "tier": tier,
-                        "rank": rank,
-                        "rr": rr,
-                        "elo": elo
-                    })
-            except Exception as e:
-                print(f"Error fetching data for {name}#{tag}: {e}")
-                continue
+        # Serve from the background snapshot; only accounts that were
+        # never fetched (e.g. right after startup or /linkacc) are fetched now
+        if leaderboard_snapshot.missing(accounts):
+            await leaderboard_snapshot.refresh(accounts, leaderboard_snapshot.missing(accounts))
+        leaderboard_data = leaderboard_snapshot.rows_for(accounts)
 
         if not leaderboard_data:
             await interaction.followup.send(
@@ -697,9 +1256,7 @@ async def leaderboard(interaction: discord.Interaction):
             )
             return
 
-        # Sort by tier (descending), then by RR (descending)
-        leaderboard_data.sort(key=lambda x: (x["tier"], x["rr"]), reverse=True)
-
+        embed_started = time.perf_counter()
         # Create embed
         embed = discord.Embed(
             title="🏆 Server Leaderboard",
@@ -710,44 +1267,71 @@ async def leaderboard(interaction: discord.Interaction):
         # Add top 3 with medals
         medals = ["🥇", "🥈", "🥉"]
 
-        for idx, player in enumerate(leaderboard_data[:15], 1):  # Limit to top 15
+        # Resolve Discord names only for the rows that are shown
+        shown = leaderboard_data[:15]
+        discord_names = await resolve_display_names(interaction.guild, [player["user_id"] for player in shown])
+
+        for idx, player in enumerate(shown, 1):  # Limit to top 15
             medal = medals[idx - 1] if idx <= 3 else f"**{idx}.**"
+            discord_name = discord_names.get(player["user_id"], "Unknown")
 
             # Get rank color for visual appeal
             rank_color = get_rank_color(player["tier"])
 
             embed.add_field(
-                name=f"{medal} {player['discord_name']}",
+                name=f"{medal} {discord_name}",
                 value=f"**{player['rank']}** ({player['rr']} RR)\n`{player['valorant_name']}`",
                 inline=False
             )
 
         if len(leaderboard_data) > 15:
-            embed.set_footer(text=f"Showing top 15 of {len(leaderboard_data)} players")
+            footer = f"Showing top 15 of {len(leaderboard_data)} players"
         else:
-            embed.set_footer(text=f"Total: {len(leaderboard_data)} players")
+            footer = f"Total: {len(leaderboard_data)} players"
+        # Rows kept from expired copies during an outage are marked with the oldest one's age
+        stale_rows = [player["fetched_at"] for player in shown if player["stale"]]
+        embed.set_footer(text=as_of_footer(footer, min(stale_rows) if stale_rows else None))
 
-        embed.timestamp = discord.utils.utcnow()
+        # Age stamp of the oldest row shown
+        embed.timestamp = datetime.fromtimestamp(min(player["fetched_at"] for player in shown), timezone.utc)
+        tracer.record("embed.build", embed_started)
 
-        await interaction.followup.send(embed=embed)
+        with tracer.span("discord.followup"):
+            await interaction.followup.send(embed=embed)
 
     except Exception as e:
         await interaction.followup.send(f"❌ Error creating leaderboard: {str(e)}")
 
+def rr_change_10_display(bundle):
+    """Exact RR change over the last 10 matches, summed from the stored RR history"""
+    if "rr_history" in bundle.pending:
+        return "…"
+    rr_history = bundle.rr_history
+    if rr_history is not None:
+        total_rr = rr_history.change_over_last(10)
+        if total_rr is not None:
+            log.debug("Exact RR change from last %d matches: %+d", len(rr_history.latest(10)), total_rr)
+            return f"{total_rr:+d}"
+        log.debug("No matches found in MMR history")
+    return "N/A"
+
 @bot.tree.command(name="rank", description="Shows current rank and RR of the player")
 @app_commands.describe(
     name="Riot ID Name (optional if account is linked)",
     tag="Riot ID Tag (optional if account is linked)",
     region="Region (eu, na, ap, kr)"
 )
+@instrumented
 async def rank(interaction: discord.Interaction, name: str = None, tag: str = None, region: str = None):
     await interaction.response.defer()
+    await remember_guild_member(interaction)
 
     try:
         # Check for linked account if name/tag not provided
         if not name or not tag:
             linked = get_linked_account(interaction.user.id)
             if linked:
+                note_linked_use(interaction.user.id)
                 name = name or linked.get("name")
                 tag = tag or linked.get("tag")
                 region = region or linked.get("region", DEFAULT_REGION)
@@ -761,8 +1345,17 @@ async def rank(interaction: discord.Interaction, name: str = None, tag: str = No
         # Use default region if not specified
         if not region:
             region = DEFAULT_REGION
-        # Get MMR data
-        mmr_data = valorant_api.get_mmr(region, name, tag)
+        # Get MMR data and RR history concurrently; the 10-match RR change is
+        # filled in later if the RR history misses the latency budget
+        bundle = await valorant_api.get_player_bundle(
+            region, name, tag, include=("mmr", "rr_history"),
+            essential=("mmr",), budget=COMMAND_LATENCY_BUDGET or None
+        )
+        mmr_data = bundle.mmr
+
+        if "mmr" in bundle.errors:
+            await interaction.followup.send(API_UNAVAILABLE_MESSAGE)
+            return
 
         if not mmr_data or mmr_data.get("status") != 200:
             await interaction.followup.send(f"❌ Rank-Information for **{name}#{tag}** not found.")
@@ -777,46 +1370,9 @@ async def rank(interaction: discord.Interaction, name: str = None, tag: str = No
         mmr_change_last_game = current_data.get("mmr_change_to_last_game", 0)
         elo = current_data.get("elo", 0)
 
-        # Calculate exact RR change over last 10 matches using MMR History API
-        mmr_change_10_matches = "N/A"
-        try:
-            # Use v1 MMR History endpoint which has exact RR changes per match
-            mmr_history_url = f"{valorant_api.base_url}/v1/mmr-history/{region}/{name}/{tag}"
-            print(f"DEBUG: Fetching MMR history from: {mmr_history_url}")
-
-            import requests
-            response = requests.get(mmr_history_url, headers=valorant_api.headers)
-
-            if response.status_code == 200:
-                mmr_history_data = response.json()
-
-                if mmr_history_data.get("status") == 200:
-                    history = mmr_history_data.get("data", [])
-                    print(f"DEBUG: Found {len(history)} matches in MMR history")
-
-                    # Sum exact RR changes from last 10 matches
-                    total_rr = 0
-                    matches_counted = 0
-
-                    for match in history[:10]:  # Take first 10 (most recent)
-                        rr_change = match.get("mmr_change_to_last_game", 0)
-                        total_rr += rr_change
-                        matches_counted += 1
-
-                    if matches_counted > 0:
-                        mmr_change_10_matches = total_rr
-                        print(f"DEBUG: Exact RR change from last {matches_counted} matches: {total_rr:+d}")
-                    else:
-                        print(f"DEBUG: No matches found in MMR history")
-                else:
-                    print(f"DEBUG: MMR history API returned status: {mmr_history_data.get('status')}")
-            else:
-                print(f"DEBUG: MMR history API error: {response.status_code}")
-        except Exception as e:
-            print(f"DEBUG: Error fetching MMR history: {e}")
-
-        print(f"DEBUG: RR Changes - Last Match: {mmr_change_last_game:+d}, Last 10 (exact): {mmr_change_10_matches}")
+        log.debug("RR Change - Last Match: %+d", mmr_change_last_game)
 
+        embed_started = time.perf_counter()
         # ===== EMBED 1: Current Rank =====
         current_tier = current_data.get("currenttier", 0)
         current_embed = discord.Embed(
@@ -849,19 +1405,14 @@ async def rank(interaction: discord.Interaction, name: str = None, tag: str = No
             inline=True
         )
 
-        # Format the 10-match change
-        if isinstance(mmr_change_10_matches, str):
-            mmr_10_display = mmr_change_10_matches
-        else:
-            mmr_10_display = f"{mmr_change_10_matches:+d}"
-
+        rr_10_field = len(current_embed.fields)
         current_embed.add_field(
             name="📈 RR Change (10 Matches)",
-            value=f"**{mmr_10_display}**",
+            value=f"**{rr_change_10_display(bundle)}**",
             inline=True
         )
 
-        current_embed.set_footer(text=f"Region: {region.upper()}")
+        current_embed.set_footer(text=stale_footer(f"Region: {region.upper()}", bundle))
         current_embed.timestamp = discord.utils.utcnow()
 
         # ===== EMBED 2: Peak Rank =====
@@ -951,20 +1502,116 @@ async def rank(interaction: discord.Interaction, name: str = None, tag: str = No
                 peak_embed.set_footer(text=f"Highest rank achieved in {peak_season_display}")
                 peak_embed.timestamp = discord.utils.utcnow()
 
+        tracer.record("embed.build", embed_started)
+
         # Send both embeds
-        if peak_embed:
-            await interaction.followup.send(embeds=[current_embed, peak_embed])
-        else:
-            await interaction.followup.send(embed=current_embed)
+        embeds = [current_embed, peak_embed] if peak_embed else [current_embed]
+        message = await send_reply(interaction, bundle, embeds=embeds)
+
+        if message is not None:
+            await valorant_api.complete_bundle(bundle)
+            current_embed.set_field_at(
+                rr_10_field,
+                name="📈 RR Change (10 Matches)",
+                value=f"**{rr_change_10_display(bundle)}**",
+                inline=True
+            )
+            current_embed.set_footer(text=stale_footer(f"Region: {region.upper()}", bundle))
+            await edit_reply(message, embeds=embeds)
 
     except Exception as e:
         await interaction.followup.send(f"❌ Error retrieving rank: {str(e)}")
 
+def format_seconds(value):
+    """Short latency string for /botstats"""
+    if value is None:
+        return "-"
+    return f"{value * 1000:.0f}ms" if value < 1 else f"{value:.1f}s"
+
+@bot.tree.command(name="botstats", description="Shows bot performance metrics (admins only)")
+@app_commands.default_permissions(administrator=True)
+@instrumented
+async def botstats(interaction: discord.Interaction):
+    if not interaction.permissions.administrator:
+        await interaction.response.send_message("❌ Only administrators can use this command.", ephemeral=True)
+        return
+
+    embed = discord.Embed(
+        title="📈 Bot Stats",
+        description=f"Since <t:{int(metrics.started_at)}:R>",
+        color=0x5865F2
+    )
+
+    # Per-command latency
+    lines = []
+    for labels, histogram in sorted(metrics.histograms("discord_command_duration_seconds").items()):
+        command = dict(labels)["command"]
+        lines.append(
+            f"`/{command}` {histogram.count}x - p50 {format_seconds(histogram.quantile(0.5))}, "
+            f"p95 {format_seconds(histogram.quantile(0.95))}"
+        )
+    embed.add_field(name="⚡ Commands", value="\n".join(lines) or "No commands yet", inline=False)
+
+    # Upstream latency and status codes per endpoint
+    lines = []
+    for labels, histogram in sorted(metrics.histograms("valorant_upstream_duration_seconds").items()):
+        endpoint = dict(labels)["endpoint"]
+        statuses = {
+            dict(key)["status"]: int(value)
+            for key, value in metrics.counters("valorant_upstream_requests_total").items()
+            if dict(key)["endpoint"] == endpoint
+        }
+        status_text = ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items()))
+        lines.append(f"`{endpoint}` p50 {format_seconds(histogram.quantile(0.5))}, p95 {format_seconds(histogram.quantile(0.95))} ({status_text})")
+    embed.add_field(name="🌐 Upstream", value="\n".join(lines) or "No requests yet", inline=False)
+
+    hits = metrics.total("valorant_cache_lookups_total", result="hit") + metrics.total("valorant_cache_lookups_total", result="store")
+    lookups = metrics.total("valorant_cache_lookups_total")
+    embed.add_field(
+        name="🗃️ Cache",
+        value=(
+            f"Hit ratio: **{hits / lookups * 100 if lookups else 0:.1f}%** ({int(lookups)} lookups)\n"
+            f"Coalesced: **{int(metrics.total('valorant_coalesced_requests_total'))}**"
+        ),
+        inline=True
+    )
+
+    scheduler = valorant_api.scheduler.stats()
+    wait = {dict(labels)["lane"]: histogram for labels, histogram in metrics.histograms("valorant_queue_wait_seconds").items()}
+    wait_text = ", ".join(f"{lane} {format_seconds(histogram.quantile(0.95))}" for lane, histogram in sorted(wait.items()))
+    embed.add_field(
+        name="🚦 Rate Limit",
+        value=(
+            f"Tokens: **{scheduler['tokens']}/{scheduler['capacity']:g}**, queued: **{scheduler['queued']}**\n"
+            f"Queue wait p95: {wait_text or '-'}"
+        ),
+        inline=True
+    )
+
+    embed.add_field(
+        name="📦 Traffic",
+        value=(
+            f"Requests: **{valorant_api.upstream_requests}**, retries: **{int(metrics.total('valorant_upstream_retries_total'))}**\n"
+            f"Received: **{metrics.total('valorant_upstream_bytes_total') / 1024 / 1024:.1f} MB**"
+        ),
+        inline=False
+    )
+
+    embed.timestamp = discord.utils.utcnow()
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
 
 if __name__ == "__main__":
     token = os.getenv('DISCORD_TOKEN')
     if not token:
         print("❌ DISCORD_TOKEN not found in .env file!")
     else:
-        bot.run(token)
+        log_listener = setup_logging(LOG_LEVEL)
+        tracer.configure(TRACE_FILE, TRACE_SAMPLE_RATE)
+        try:
+            # Logging is already set up (queued), so discord.py shouldn't add its own handler
+            bot.run(token, log_handler=None)
+        finally:
+            tracer.close()
+            log_listener.stop()
 
@@ -0,0 +1,164 @@
+import json
+import sqlite3
+import threading
+import zlib
+from typing import Optional, Dict, Any, List, Iterable, Tuple
+
+class MatchStore:
+    """Durable SQLite store of finished match payloads, keyed by matchid"""
+
+    def __init__(self, path: str = "matches.db"):
+        self.path = path
+        # Calls come from the default executor, so guard the shared connection
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._create_tables()
+
+    def _create_tables(self):
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS matches (
+                    match_id   TEXT PRIMARY KEY,
+                    season     TEXT,
+                    mode       TEXT,
+                    game_start INTEGER,
+                    payload    BLOB NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS match_players (
+                    puuid    TEXT NOT NULL,
+                    match_id TEXT NOT NULL,
+                    PRIMARY KEY (puuid, match_id)
+                );
+                CREATE INDEX IF NOT EXISTS idx_matches_season_start ON matches (season, game_start);
+                CREATE INDEX IF NOT EXISTS idx_matches_start ON matches (game_start);
+                CREATE INDEX IF NOT EXISTS idx_match_players_match ON match_players (match_id);
+                CREATE TABLE IF NOT EXISTS player_sync (
+                    region         TEXT NOT NULL,
+                    name           TEXT NOT NULL,
+                    tag            TEXT NOT NULL,
+                    mode           TEXT NOT NULL,
+                    puuid          TEXT NOT NULL,
+                    newest_match   TEXT NOT NULL,
+                    newest_start   INTEGER,
+                    PRIMARY KEY (region, name, tag, mode)
+                );
+                CREATE TABLE IF NOT EXISTS rr_history (
+                    region          TEXT NOT NULL,
+                    name            TEXT NOT NULL,
+                    tag             TEXT NOT NULL,
+                    match_id        TEXT NOT NULL,
+                    date_raw        INTEGER NOT NULL,
+                    rr_change       INTEGER NOT NULL,
+                    tier            INTEGER,
+                    ranking_in_tier INTEGER,
+                    elo             INTEGER,
+                    map             TEXT,
+                    PRIMARY KEY (region, name, tag, match_id)
+                );
+                CREATE INDEX IF NOT EXISTS idx_rr_history_player_date ON rr_history (region, name, tag, date_raw);
+            """)
+
+    @staticmethod
+    def _encode(match: Dict[str, Any]) -> bytes:
+        return zlib.compress(json.dumps(match, separators=(",", ":")).encode("utf-8"))
+
+    @staticmethod
+    def _decode(payload: bytes) -> Dict[str, Any]:
+        return json.loads(zlib.decompress(payload).decode("utf-8"))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def put_many(self, matches: Iterable[Dict[str, Any]]) -> int:
+        """Store matches that aren't stored yet; returns how many were new"""
+        match_rows = []
+        player_rows = []
+        for match in matches:
+            metadata = match.get("metadata", {})
+            match_id = metadata.get("matchid")
+            if not match_id:
+                continue
+
+            season = metadata.get("season", {})
+            match_rows.append((
+                match_id,
+                season.get("short") if isinstance(season, dict) else season,
+                (metadata.get("mode_id") or metadata.get("mode") or "").lower(),
+                metadata.get("game_start", 0),
+                self._encode(match),
+            ))
+            for player in match.get("players", {}).get("all_players", []):
+                if player.get("puuid"):
+                    player_rows.append((player["puuid"], match_id))
+
+        if not match_rows:
+            return 0
+
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany("INSERT OR IGNORE INTO matches VALUES (?, ?, ?, ?, ?)", match_rows)
+            added = self._conn.total_changes - before
+            self._conn.executemany("INSERT OR IGNORE INTO match_players VALUES (?, ?)", player_rows)
+        return added
+
+    def recent_for_player(self, puuid: str, mode: Optional[str] = None, season: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """Stored matches of a player, newest first"""
+        query = (
+            "SELECT m.payload FROM matches m JOIN match_players p ON p.match_id = m.match_id "
+            "WHERE p.puuid = ?"
+        )
+        args: List[Any] = [puuid]
+        if mode:
+            query += " AND m.mode = ?"
+            args.append(mode.lower())
+        if season:
+            query += " AND m.season = ?"
+            args.append(season)
+        query += " ORDER BY m.game_start DESC LIMIT ?"
+        args.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(query, args).fetchall()
+        return [self._decode(payload) for (payload,) in rows]
+
+    def get_sync_state(self, region: str, name: str, tag: str, mode: str) -> Optional[Dict[str, Any]]:
+        """Return the newest known match of a player, or None if never synced"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT puuid, newest_match, newest_start FROM player_sync "
+                "WHERE region = ? AND name = ? AND tag = ? AND mode = ?",
+                (region.lower(), name.lower(), tag.lower(), mode.lower())
+            ).fetchone()
+        if not row:
+            return None
+        return {"puuid": row[0], "newest_match": row[1], "newest_start": row[2]}
+
+    def set_sync_state(self, region: str, name: str, tag: str, mode: str, puuid: str, newest_match: str, newest_start: int):
+        """Remember the newest known match of a player"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO player_sync VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (region.lower(), name.lower(), tag.lower(), mode.lower(), puuid, newest_match, newest_start)
+            )
+
+    def put_rr_changes(self, region: str, name: str, tag: str, rows: Iterable[Tuple]) -> int:
+        """Append RR changes (match_id, date_raw, rr_change, tier, ranking_in_tier, elo, map); returns how many were new"""
+        player = (region.lower(), name.lower(), tag.lower())
+        rows = [player + tuple(row) for row in rows]
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany("INSERT OR IGNORE INTO rr_history VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            return self._conn.total_changes - before
+
+    def rr_changes(self, region: str, name: str, tag: str, limit: int = 100) -> List[Tuple]:
+        """Stored RR changes of a player, newest first, in put_rr_changes column order"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT match_id, date_raw, rr_change, tier, ranking_in_tier, elo, map FROM rr_history "
+                "WHERE region = ? AND name = ? AND tag = ? ORDER BY date_raw DESC LIMIT ?",
+                (region.lower(), name.lower(), tag.lower(), limit)
+            ).fetchall()
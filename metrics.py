@@ -0,0 +1,168 @@
+import bisect
+import logging
+import time
+from aiohttp import web
+from contextlib import contextmanager
+from typing import Optional, Dict, Tuple, List, Callable
+
+log = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def _labels(labels: Dict[str, object]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+class Histogram:
+    """Fixed-bucket histogram, like a Prometheus histogram"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        # One count per bucket plus the +Inf bucket (not cumulative)
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by interpolating inside its bucket (None if empty)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                if index == len(self.buckets):
+                    # Beyond the last bound there is nothing to interpolate towards
+                    return lower
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+class MetricsRegistry:
+    """Counters, histograms and sampled gauges, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        # Gauges are read from a callback when rendered: name -> callback returning {labels: value}
+        self._gauges: Dict[str, Callable[[], Dict[Labels, float]]] = {}
+        self._help: Dict[str, str] = {}
+        self.started_at = time.time()
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Add value to a counter"""
+        series = self._counters.setdefault(name, {})
+        key = _labels(labels)
+        series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """Record one value in a histogram"""
+        series = self._histograms.setdefault(name, {})
+        key = _labels(labels)
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram()
+        histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Observe the duration of the block in a histogram"""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - started, **labels)
+
+    def gauge(self, name: str, callback: Callable[[], object], help_text: str = ""):
+        """Register a gauge sampled on render; callback returns a number or {((label, value), ...): number}"""
+        def sample():
+            value = callback()
+            if isinstance(value, dict):
+                return {_labels(dict(labels)): number for labels, number in value.items()}
+            return {(): value}
+        self._gauges[name] = sample
+        if help_text:
+            self.describe(name, help_text)
+
+    def counters(self, name: str) -> Dict[Labels, float]:
+        return dict(self._counters.get(name, {}))
+
+    def histograms(self, name: str) -> Dict[Labels, Histogram]:
+        return dict(self._histograms.get(name, {}))
+
+    def total(self, name: str, **labels) -> float:
+        """Sum of a counter over every series matching the given labels"""
+        wanted = set(_labels(labels))
+        return sum(value for key, value in self._counters.get(name, {}).items() if wanted <= set(key))
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format"""
+        lines: List[str] = []
+
+        def header(name, kind):
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for name, series in sorted(self._counters.items()):
+            header(name, "counter")
+            for labels, value in sorted(series.items()):
+                lines.append(f"{name}{_format_labels(labels)} {value:g}")
+
+        for name, sample in sorted(self._gauges.items()):
+            try:
+                series = sample()
+            except Exception as e:
+                log.warning("Error sampling gauge %s: %s", name, e)
+                continue
+            header(name, "gauge")
+            for labels, value in sorted(series.items()):
+                lines.append(f"{name}{_format_labels(labels)} {value:g}")
+
+        for name, series in sorted(self._histograms.items()):
+            header(name, "histogram")
+            for labels, histogram in sorted(series.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', f'{bound:g}'))} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {histogram.count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum:g}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+    async def start_server(self, host: str = "127.0.0.1", port: int = 9108) -> web.AppRunner:
+        """Serve GET /metrics over HTTP; cleanup() the returned runner to stop"""
+        async def handle(request):
+            return web.Response(text=self.render(), content_type="text/plain", charset="utf-8")
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        log.info("Serving metrics on http://%s:%s/metrics", host, port)
+        return runner
+
+# Shared registry for the bot and the API client
+metrics = MetricsRegistry()
@@ -0,0 +1,303 @@
+from typing import Optional, Dict, Any, List, Tuple
+
+class PlayerMatchRow:
+    """One player's stats line in a match"""
+
+    __slots__ = (
+        "puuid", "name", "tag", "name_key", "team", "character", "agent_icon",
+        "score", "kills", "deaths", "assists", "headshots", "bodyshots", "legshots",
+        "damage_made", "damage_received", "placement",
+    )
+
+    def __init__(self, puuid: str, name: str, tag: str, team: str, character: str, agent_icon: Optional[str],
+                 score: int, kills: int, deaths: int, assists: int, headshots: int, bodyshots: int, legshots: int,
+                 damage_made: int, damage_received: int):
+        self.puuid = puuid
+        self.name = name
+        self.tag = tag
+        # Riot IDs are case-insensitive, so compare on a lowercased key built once
+        self.name_key = f"{name.lower()}#{tag.lower()}"
+        self.team = team
+        self.character = character
+        self.agent_icon = agent_icon
+        self.score = score
+        self.kills = kills
+        self.deaths = deaths
+        self.assists = assists
+        self.headshots = headshots
+        self.bodyshots = bodyshots
+        self.legshots = legshots
+        self.damage_made = damage_made
+        self.damage_received = damage_received
+        # Lobby placement by score, filled in by MatchSummary
+        self.placement = 0
+
+    @classmethod
+    def from_payload(cls, player: Dict[str, Any]) -> "PlayerMatchRow":
+        """Build a row from a v3 (or projected) all_players entry"""
+        stats = player.get("stats", {})
+
+        # Damage dealt handling - try multiple possible structures
+        damage_data = stats.get("damage", {})
+        damage_made = 0
+        if isinstance(damage_data, dict):
+            # Try "made" field, then "damage" field
+            damage_made = damage_data.get("made", 0) or damage_data.get("damage", 0)
+        elif isinstance(damage_data, (int, float)):
+            damage_made = damage_data
+
+        # If still 0, try alternative locations
+        if damage_made == 0:
+            damage_made = stats.get("damage_made", 0) or player.get("damage_made", 0)
+
+        # Damage received handling
+        damage_received = player.get("damage_received", 0)
+        if damage_received == 0 and isinstance(damage_data, dict):
+            damage_received = damage_data.get("received", 0)
+
+        return cls(
+            puuid=player.get("puuid", ""),
+            name=player.get("name", ""),
+            tag=player.get("tag", ""),
+            team=player.get("team", "").lower(),
+            character=player.get("character", "Unknown"),
+            agent_icon=player.get("assets", {}).get("agent", {}).get("small"),
+            score=stats.get("score", 0),
+            kills=stats.get("kills", 0),
+            deaths=stats.get("deaths", 0),
+            assists=stats.get("assists", 0),
+            headshots=stats.get("headshots", 0),
+            bodyshots=stats.get("bodyshots", 0),
+            legshots=stats.get("legshots", 0),
+            damage_made=damage_made,
+            damage_received=damage_received,
+        )
+
+    def to_payload(self) -> Dict[str, Any]:
+        """Serialize back to the v3 all_players shape (only the fields kept here)"""
+        payload = {
+            "puuid": self.puuid,
+            "name": self.name,
+            "tag": self.tag,
+            "team": self.team,
+            "character": self.character,
+            "stats": {
+                "score": self.score,
+                "kills": self.kills,
+                "deaths": self.deaths,
+                "assists": self.assists,
+                "headshots": self.headshots,
+                "bodyshots": self.bodyshots,
+                "legshots": self.legshots,
+            },
+            "damage_made": self.damage_made,
+            "damage_received": self.damage_received,
+        }
+        if self.agent_icon:
+            payload["assets"] = {"agent": {"small": self.agent_icon}}
+        return payload
+
+    @property
+    def total_shots(self) -> int:
+        return self.headshots + self.bodyshots + self.legshots
+
+
+class MatchSummary:
+    """The parts of a match the bot uses, built once when the match is ingested"""
+
+    __slots__ = (
+        "match_id", "map", "mode", "season", "game_start", "game_start_patched", "rounds_played",
+        "red_won", "blue_won", "red_rounds", "blue_rounds", "players", "_by_puuid", "_by_name",
+    )
+
+    def __init__(self, match_id: str, map: str, mode: str, season: str, game_start: int, game_start_patched: str,
+                 rounds_played: int, red_won: bool, blue_won: bool, red_rounds: int, blue_rounds: int,
+                 players: List[PlayerMatchRow]):
+        self.match_id = match_id
+        self.map = map
+        self.mode = mode
+        self.season = season
+        self.game_start = game_start
+        self.game_start_patched = game_start_patched
+        self.rounds_played = rounds_played
+        self.red_won = red_won
+        self.blue_won = blue_won
+        self.red_rounds = red_rounds
+        self.blue_rounds = blue_rounds
+        self.players = players
+
+        # Index rows once so "this player's row" is a dict lookup
+        self._by_puuid = {player.puuid: player for player in players if player.puuid}
+        self._by_name = {player.name_key: player for player in players}
+
+        # Precompute lobby placement (rank by score, stable for ties)
+        for placement, player in enumerate(sorted(players, key=lambda p: p.score, reverse=True), 1):
+            player.placement = placement
+
+    @classmethod
+    def from_payload(cls, match: Dict[str, Any]) -> "MatchSummary":
+        """Build a summary from a v3 match payload, dropping rounds, kills and economy data"""
+        metadata = match.get("metadata", {})
+        season = metadata.get("season", {})
+        teams = match.get("teams") or {}
+        red = teams.get("red") or {}
+        blue = teams.get("blue") or {}
+
+        return cls(
+            match_id=metadata.get("matchid", ""),
+            map=metadata.get("map", "Unknown"),
+            mode=(metadata.get("mode_id") or metadata.get("mode") or "").lower(),
+            season=season.get("short", "") if isinstance(season, dict) else (season or ""),
+            game_start=metadata.get("game_start", 0),
+            game_start_patched=metadata.get("game_start_patched", "Unknown date"),
+            rounds_played=metadata.get("rounds_played", 0),
+            red_won=red.get("has_won", False),
+            blue_won=blue.get("has_won", False),
+            red_rounds=red.get("rounds_won", 0),
+            blue_rounds=blue.get("rounds_won", 0),
+            players=[PlayerMatchRow.from_payload(player) for player in match.get("players", {}).get("all_players", [])],
+        )
+
+    def to_payload(self) -> Dict[str, Any]:
+        """Serialize back to the v3 match shape (only the fields kept here)"""
+        return {
+            "metadata": {
+                "matchid": self.match_id,
+                "map": self.map,
+                "mode_id": self.mode,
+                "season": {"short": self.season},
+                "game_start": self.game_start,
+                "game_start_patched": self.game_start_patched,
+                "rounds_played": self.rounds_played,
+            },
+            "teams": {
+                "red": {"has_won": self.red_won, "rounds_won": self.red_rounds},
+                "blue": {"has_won": self.blue_won, "rounds_won": self.blue_rounds},
+            },
+            "players": {"all_players": [player.to_payload() for player in self.players]},
+        }
+
+    def find_player(self, name: str, tag: str, puuid: Optional[str] = None) -> Optional[PlayerMatchRow]:
+        """Return the row of a player, by puuid when known (survives Riot ID changes), else by Riot ID"""
+        if puuid:
+            player = self._by_puuid.get(puuid)
+            if player:
+                return player
+        return self._by_name.get(f"{name.lower()}#{tag.lower()}")
+
+    def won(self, team: str) -> bool:
+        """Whether the given team ("red" or "blue") won"""
+        return self.red_won if team == "red" else self.blue_won
+
+    def score_line(self, team: str) -> str:
+        """Round score from the given team's point of view, e.g. 13-9"""
+        if team == "red":
+            return f"{self.red_rounds}-{self.blue_rounds}"
+        return f"{self.blue_rounds}-{self.red_rounds}"
+
+
+class PlayerBundle:
+    """Upstream documents a command needs for one player, fetched together"""
+
+    __slots__ = ("account", "mmr", "mmr_history", "rr_history", "matches", "season_name", "errors", "stale_as_of", "pending", "_stale_reads")
+
+    def __init__(self):
+        self.account: Optional[Dict[str, Any]] = None
+        self.mmr: Optional[Dict[str, Any]] = None
+        self.mmr_history: Optional[Dict[str, Any]] = None
+        self.rr_history: Optional["RRHistory"] = None
+        # Current-act matches, or None if the match history couldn't be fetched
+        self.matches: Optional[List[MatchSummary]] = None
+        self.season_name = "Unknown Act"
+        # Parts that raised (timeouts, connection errors, open circuit breaker)
+        self.errors: Tuple[str, ...] = ()
+        # Unix time of the oldest expired document served in place of a fresh one
+        self.stale_as_of: Optional[float] = None
+        # Parts still loading when a latency budget ran out: part -> asyncio task
+        self.pending: Dict[str, Any] = {}
+        self._stale_reads: List[float] = []
+
+    @property
+    def puuid(self) -> Optional[str]:
+        if self.account and self.account.get("status") == 200:
+            return self.account.get("data", {}).get("puuid")
+        return None
+
+
+class RRChange:
+    """RR gained or lost in one competitive match, from v1/mmr-history"""
+
+    __slots__ = ("match_id", "date_raw", "rr_change", "tier", "ranking_in_tier", "elo", "map")
+
+    def __init__(self, match_id: str, date_raw: int, rr_change: int, tier: int, ranking_in_tier: int, elo: int, map: str):
+        self.match_id = match_id
+        self.date_raw = date_raw
+        self.rr_change = rr_change
+        self.tier = tier
+        self.ranking_in_tier = ranking_in_tier
+        self.elo = elo
+        self.map = map
+
+    @classmethod
+    def from_payload(cls, entry: Dict[str, Any]) -> "RRChange":
+        """Build a change from a v1/mmr-history data entry"""
+        map_data = entry.get("map", {})
+        return cls(
+            match_id=entry.get("match_id", ""),
+            date_raw=entry.get("date_raw", 0),
+            rr_change=entry.get("mmr_change_to_last_game", 0),
+            tier=entry.get("currenttier", 0),
+            ranking_in_tier=entry.get("ranking_in_tier", 0),
+            elo=entry.get("elo", 0),
+            map=map_data.get("name", "Unknown") if isinstance(map_data, dict) else (map_data or "Unknown"),
+        )
+
+    @classmethod
+    def from_row(cls, row: Tuple) -> "RRChange":
+        """Build a change from a match store row (see to_row)"""
+        return cls(*row)
+
+    def to_row(self) -> Tuple:
+        """Column values in match store order"""
+        return (self.match_id, self.date_raw, self.rr_change, self.tier, self.ranking_in_tier, self.elo, self.map)
+
+
+class RRHistory:
+    """A player's RR changes keyed by matchid, newest first; entries are only ever added"""
+
+    __slots__ = ("_by_match", "_entries")
+
+    def __init__(self, changes: Optional[List[RRChange]] = None):
+        self._by_match: Dict[str, RRChange] = {}
+        self._entries: List[RRChange] = []
+        if changes:
+            self.merge(changes)
+
+    def merge(self, changes: List[RRChange]) -> List[RRChange]:
+        """Add changes for matches not seen yet; returns the ones that were new"""
+        added = []
+        for change in changes:
+            if change.match_id and change.match_id not in self._by_match:
+                self._by_match[change.match_id] = change
+                added.append(change)
+        if added:
+            self._entries = sorted(self._by_match.values(), key=lambda c: c.date_raw, reverse=True)
+        return added
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def latest(self, count: int) -> List[RRChange]:
+        """The most recent `count` changes"""
+        return self._entries[:count]
+
+    def change_over_last(self, count: int) -> Optional[int]:
+        """Net RR over the last `count` games, or None if there is no history"""
+        if not self._entries:
+            return None
+        return sum(change.rr_change for change in self._entries[:count])
+
+    def change_for_match(self, match_id: str) -> Optional[int]:
+        """RR gained or lost in a match, or None if the match isn't in the history"""
+        change = self._by_match.get(match_id)
+        return change.rr_change if change else None
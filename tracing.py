@@ -0,0 +1,161 @@
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Optional, Dict, Any
+
+log = logging.getLogger(__name__)
+
+def setup_logging(level: str = "INFO") -> logging.handlers.QueueListener:
+    """Send log records through a queue so the event loop never waits on console I/O"""
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s %(name)s: %(message)s"))
+    records: "queue.Queue" = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(records, console)
+
+    root = logging.getLogger()
+    root.setLevel(level.upper())
+    root.addHandler(logging.handlers.QueueHandler(records))
+    listener.start()
+    return listener
+
+class Span:
+    """One timed operation inside a trace"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "attrs", "start", "_started", "duration", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attrs: Dict[str, Any]):
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.attrs = attrs
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self.duration = 0.0
+        self.error: Optional[str] = None
+
+    def set(self, **attrs):
+        """Attach attributes, e.g. a status code known only after the call"""
+        self.attrs.update(attrs)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "duration_ms": round(self.duration * 1000, 3),
+            "attrs": self.attrs,
+            "error": self.error,
+        }
+
+class _NoopSpan:
+    """Stands in for a span when the trace isn't sampled"""
+
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+NOOP_SPAN = _NoopSpan()
+
+# Innermost open span of the running task (inherited by tasks it creates)
+current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+class Tracer:
+    """Sampled per-interaction traces written as JSON lines to a rotating file"""
+
+    def __init__(self):
+        self.sample_rate = 0.0
+        self._logger = logging.getLogger("tracing.spans")
+        # Spans go to the trace file only, never to the console
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._listener: Optional[logging.handlers.QueueListener] = None
+
+    def configure(self, path: str, sample_rate: float, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 3):
+        """Start writing sampled traces to path; the file is written from a background thread"""
+        self.close()
+        self.sample_rate = sample_rate
+        if not path or sample_rate <= 0:
+            return
+
+        file_handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        file_handler.setFormatter(logging.Formatter("%(message)s"))
+        spans: "queue.Queue" = queue.Queue(-1)
+        self._logger.addHandler(logging.handlers.QueueHandler(spans))
+        self._listener = logging.handlers.QueueListener(spans, file_handler)
+        self._listener.start()
+
+    def close(self):
+        """Flush queued spans and stop the writer thread"""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+        for handler in list(self._logger.handlers):
+            self._logger.removeHandler(handler)
+
+    @contextmanager
+    def trace(self, name: str, **attrs):
+        """Open the root span of a trace, sampled at sample_rate"""
+        if self._listener is None or random.random() >= self.sample_rate:
+            # Unsampled: children see no parent and cost next to nothing
+            token = current_span.set(None)
+            try:
+                yield NOOP_SPAN
+            finally:
+                current_span.reset(token)
+            return
+
+        with self._run(Span(name, uuid.uuid4().hex, None, attrs)) as span:
+            yield span
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """Open a child span of the current one; a no-op outside a sampled trace"""
+        parent = current_span.get()
+        if parent is None:
+            yield NOOP_SPAN
+            return
+
+        with self._run(Span(name, parent.trace_id, parent.span_id, attrs)) as span:
+            yield span
+
+    def record(self, name: str, started: float, **attrs):
+        """Record a finished child span that began at time.perf_counter() == started"""
+        parent = current_span.get()
+        if parent is None:
+            return
+        span = Span(name, parent.trace_id, parent.span_id, attrs)
+        span.start -= span._started - started
+        span.duration = span._started - started
+        self._export(span)
+
+    def _export(self, span: Span):
+        try:
+            self._logger.info(json.dumps(span.to_dict(), default=str))
+        except Exception as e:
+            log.warning("Could not export span %s: %s", span.name, e)
+
+    @contextmanager
+    def _run(self, span: Span):
+        token = current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration = time.perf_counter() - span._started
+            current_span.reset(token)
+            self._export(span)
+
+# Shared tracer for the bot and the API client
+tracer = Tracer()
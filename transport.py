@@ -0,0 +1,148 @@
+import aiohttp
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+from typing import Optional, Dict, Any, Tuple, Mapping
+from urllib.parse import urlsplit, unquote
+
+log = logging.getLogger(__name__)
+
+# (status code, response headers, raw body)
+TransportResponse = Tuple[int, Mapping[str, str], bytes]
+
+# Response headers worth keeping in a cassette
+RECORDED_HEADERS = ("content-type", "retry-after", "x-ratelimit-limit", "x-ratelimit-remaining", "x-ratelimit-reset")
+
+class HttpTransport:
+    """Sends requests to the real API over one shared aiohttp session (the default)"""
+
+    # Requests go through the rate-limit scheduler
+    rate_limited = True
+
+    def __init__(self, headers: Dict[str, str], max_connections: int = 20, timeout: float = 10.0):
+        self.headers = headers
+        self.max_connections = max_connections
+        # Upper bound for a whole request, so a hanging API can't hold a command forever
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared HTTP session, opening it on first use"""
+        # Created lazily because aiohttp sessions must be opened inside a running loop
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections)
+            self._session = aiohttp.ClientSession(headers=self.headers, connector=connector, timeout=self.timeout)
+        return self._session
+
+    async def fetch(self, url: str, params: Optional[Dict[str, Any]] = None) -> TransportResponse:
+        session = await self._get_session()
+        async with session.get(url, params=params) as response:
+            return response.status, response.headers, await response.read()
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+def cassette_key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """File name of a request's cassette; host-independent and case-insensitive like Riot IDs"""
+    path = unquote(urlsplit(url).path).lower()
+    query = "&".join(f"{key}={value}" for key, value in sorted((params or {}).items()))
+    digest = hashlib.sha1(f"{path}?{query}".encode("utf-8")).hexdigest()[:16]
+    # Keep the endpoint readable in directory listings, e.g. v2-mmr-3f2a...
+    endpoint = "-".join(path.strip("/").split("/")[1:3]) or "root"
+    return f"{endpoint}-{digest}.json.gz"
+
+class RecordingTransport:
+    """Passes requests through and writes every real answer to a gzip cassette directory
+
+    429s and 5xx responses are not recorded, so a throttled or failed call never
+    replaces a good cassette of the same request.
+    """
+
+    rate_limited = True
+
+    def __init__(self, inner: HttpTransport, cassette_dir: str):
+        self.inner = inner
+        self.cassette_dir = cassette_dir
+        os.makedirs(cassette_dir, exist_ok=True)
+        self.recorded = 0
+
+    async def fetch(self, url: str, params: Optional[Dict[str, Any]] = None) -> TransportResponse:
+        status, headers, body = await self.inner.fetch(url, params)
+        if status >= 500 or status == 429:
+            return status, headers, body
+        cassette = {
+            "request": {"path": urlsplit(url).path, "params": params or {}},
+            "status": status,
+            "headers": {name: headers[name] for name in RECORDED_HEADERS if name in headers},
+            "body": body.decode("utf-8", errors="replace"),
+        }
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._write, cassette_key(url, params), cassette)
+            self.recorded += 1
+        except OSError as e:
+            log.warning("Could not record %s: %s", url, e)
+        return status, headers, body
+
+    def _write(self, name: str, cassette: Dict[str, Any]):
+        # Write then rename, so a replay never reads a half-written cassette
+        path = os.path.join(self.cassette_dir, name)
+        with gzip.open(path + ".tmp", "wt", encoding="utf-8") as f:
+            json.dump(cassette, f)
+        os.replace(path + ".tmp", path)
+
+    async def close(self):
+        await self.inner.close()
+
+class ReplayTransport:
+    """Serves recorded cassettes without touching the network; unknown requests get a 404"""
+
+    # Replays run at full speed, so they skip the rate-limit scheduler
+    rate_limited = False
+
+    def __init__(self, cassette_dir: str):
+        self.cassette_dir = cassette_dir
+        # Cassettes are immutable during a replay, so keep the decoded ones
+        self._loaded: Dict[str, Optional[Dict[str, Any]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self, name: str) -> Optional[Dict[str, Any]]:
+        if name not in self._loaded:
+            try:
+                with gzip.open(os.path.join(self.cassette_dir, name), "rt", encoding="utf-8") as f:
+                    self._loaded[name] = json.load(f)
+            except FileNotFoundError:
+                self._loaded[name] = None
+        return self._loaded[name]
+
+    async def fetch(self, url: str, params: Optional[Dict[str, Any]] = None) -> TransportResponse:
+        name = cassette_key(url, params)
+        cassette = self._loaded[name] if name in self._loaded else await asyncio.get_running_loop().run_in_executor(None, self._load, name)
+        if cassette is None:
+            self.misses += 1
+            log.warning("No cassette for %s %s", url, params or "")
+            body = {"status": 404, "errors": [{"code": 0, "message": "No recorded response", "status": 404}]}
+            return 404, {"content-type": "application/json"}, json.dumps(body).encode("utf-8")
+
+        self.hits += 1
+        return cassette["status"], cassette["headers"], cassette["body"].encode("utf-8")
+
+    async def close(self):
+        pass
+
+def make_transport(mode: str, headers: Dict[str, str], cassette_dir: str = "cassettes", max_connections: int = 20, timeout: float = 10.0):
+    """Build the transport for a mode: "passthrough" (default), "record" or "replay" """
+    mode = (mode or "passthrough").lower()
+    if mode == "replay":
+        return ReplayTransport(cassette_dir)
+    http = HttpTransport(headers, max_connections, timeout)
+    if mode == "record":
+        return RecordingTransport(http, cassette_dir)
+    if mode != "passthrough":
+        raise ValueError(f"Unknown transport mode: {mode}")
+    return http
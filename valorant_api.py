@@ -1,99 +1,751 @@
-import requests
-from typing import Optional, Dict, Any
+import asyncio
+import contextvars
+import heapq
+import itertools
+import json
+import logging
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Tuple, List, Mapping, Callable
+from match_store import MatchStore
+from metrics import metrics
+from tracing import tracer
+from transport import make_transport
+from models import MatchSummary, PlayerBundle, RRChange, RRHistory
+
+log = logging.getLogger(__name__)
+
+# Seconds a cached response stays fresh, per endpoint (None = never expires)
+CACHE_TTLS = {
+    "account": 3600,      # v1/account - name, card and puuid rarely change
+    "mmr": 60,            # v2/mmr - changes after every ranked game
+    "mmr_history": 60,    # v1/mmr-history
+    "matches": 120,       # v3/matches - list of recent matches
+    "match": None,        # single match body keyed by matchid - immutable
+    "rr_history": None,   # RRHistory series - append-only, merged from v1/mmr-history
+}
+
+# Most RR changes per player loaded back from the match store
+RR_HISTORY_LIMIT = 100
+
+def summarize_match_list(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn every match of a v3/matches response into a MatchSummary"""
+    if data.get("status") == 200 and isinstance(data.get("data"), list):
+        data["data"] = [MatchSummary.from_payload(match) for match in data["data"]]
+    return data
+
+class ResponseCache:
+    """Bounded LRU cache where every entry carries its own expiry time
+
+    Expired entries stay until they are evicted or replaced, so they can still
+    be served as stale copies while upstream is unavailable.
+    """
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        # key -> (expiry in time.monotonic(), value, time.time() it was stored)
+        self._entries: "OrderedDict[Tuple, Tuple[Optional[float], Any, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value, _ = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def get_stale(self, key: Tuple) -> Optional[Tuple[Any, float]]:
+        """Return (value, time.time() it was stored) for key even if expired, or None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        return entry[1], entry[2]
+
+    def __contains__(self, key: Tuple) -> bool:
+        """Membership test that doesn't touch the LRU order or counters"""
+        entry = self._entries.get(key)
+        return entry is not None and (entry[0] is None or entry[0] > time.monotonic())
+
+    def set(self, key: Tuple, value: Any, ttl: Optional[float]):
+        """Store value under key, evicting the least recently used entries"""
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        self._entries[key] = (expires_at, value, time.time())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, predicate: Callable[[Tuple], bool]) -> int:
+        """Drop every entry whose key matches predicate; returns how many were dropped"""
+        keys = [key for key in self._entries if predicate(key)]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def expire(self, predicate: Callable[[Tuple], bool]) -> int:
+        """Mark every entry whose key matches predicate as expired, keeping it as a stale copy"""
+        now = time.monotonic()
+        keys = [key for key in self._entries if predicate(key)]
+        for key in keys:
+            _, value, stored_at = self._entries[key]
+            self._entries[key] = (now, value, stored_at)
+        return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+        }
+
+# Priority lanes for upstream requests (lower value is served first)
+PRIORITY_INTERACTIVE = 0   # slash commands a user is waiting on
+PRIORITY_LEADERBOARD = 1   # /leaderboard fan-out
+PRIORITY_BACKGROUND = 2    # prefetching and refreshers
+
+# Share of the bucket each lane must leave untouched for higher lanes
+LANE_RESERVE = {
+    PRIORITY_INTERACTIVE: 0.0,
+    PRIORITY_LEADERBOARD: 0.2,
+    PRIORITY_BACKGROUND: 0.5,
+}
+
+LANE_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_LEADERBOARD: "leaderboard",
+    PRIORITY_BACKGROUND: "background",
+}
+
+request_priority = contextvars.ContextVar("request_priority", default=PRIORITY_INTERACTIVE)
+
+# Store times of the stale documents served inside ValorantAPI.track_staleness()
+stale_reads: contextvars.ContextVar = contextvars.ContextVar("stale_reads", default=None)
+
+class RateLimitScheduler:
+    """Token bucket in front of every upstream request, granted by priority lane"""
+
+    def __init__(self, requests_per_minute: int = 30):
+        self.capacity = float(requests_per_minute)
+        self.tokens = self.capacity
+        self.refill_rate = requests_per_minute / 60.0  # tokens per second
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._waiters: List[Tuple[int, int, "asyncio.Future"]] = []
+        self._counter = itertools.count()
+        self._dispatcher: Optional["asyncio.Task"] = None
+        # Set when a waiter that outranks the current head is queued (created inside the loop)
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.refill_rate)
+        self._updated = now
+
+    async def acquire(self, priority: int = PRIORITY_INTERACTIVE):
+        """Wait until this lane may send one request"""
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future))
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+        elif self._waiters[0][2] is future:
+            # The dispatcher may be waiting out a lower lane's reserve; re-evaluate the head
+            self._wakeup.set()
+        await future
+
+    async def _dispatch(self):
+        """Hand out tokens to waiters, highest priority first"""
+        while self._waiters:
+            priority, _, future = self._waiters[0]
+            if future.done():
+                # Waiter was cancelled while queued
+                heapq.heappop(self._waiters)
+                continue
+
+            now = time.monotonic()
+            if now < self._blocked_until:
+                await asyncio.sleep(self._blocked_until - now)
+                continue
+
+            self._refill()
+            needed = 1 + self.capacity * LANE_RESERVE.get(priority, 0.0)
+            if self.tokens >= needed:
+                heapq.heappop(self._waiters)
+                self.tokens -= 1
+                future.set_result(None)
+                continue
+
+            # Wait for the tokens, unless a higher-priority waiter arrives first
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), (needed - self.tokens) / self.refill_rate)
+            except asyncio.TimeoutError:
+                pass
+
+    def update(self, status: int, headers: Mapping[str, str]):
+        """Adapt the bucket to the rate-limit headers of an upstream response"""
+        self._refill()
+        now = time.monotonic()
+
+        limit = _header_number(headers, "x-ratelimit-limit")
+        remaining = _header_number(headers, "x-ratelimit-remaining")
+        reset = _header_number(headers, "x-ratelimit-reset")
+
+        if limit:
+            # HenrikDev limits are per minute
+            self.capacity = limit
+            self.refill_rate = limit / 60.0
+        if remaining is not None:
+            # Upstream is the source of truth for what is left
+            self.tokens = min(self.tokens, remaining)
+            if remaining <= 0 and reset:
+                self._blocked_until = max(self._blocked_until, now + reset)
+
+        if status == 429:
+            retry_after = _header_number(headers, "retry-after") or reset or 60.0
+            self.tokens = 0.0
+            self._blocked_until = max(self._blocked_until, now + retry_after)
+            log.warning("Rate limited by upstream, pausing for %ss", retry_after)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the current bucket state"""
+        self._refill()
+        return {
+            "tokens": round(self.tokens, 2),
+            "capacity": self.capacity,
+            "queued": len(self._waiters),
+            "blocked_for": round(max(0.0, self._blocked_until - time.monotonic()), 2),
+        }
+
+class UpstreamUnavailable(Exception):
+    """Raised instead of sending a request to an endpoint whose circuit breaker is open"""
+
+class CircuitBreaker:
+    """Stops sending requests to an endpoint after repeated failures
+
+    Once open, one probe request is let through every reset_timeout seconds;
+    the first success closes the breaker again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def retry_in(self) -> float:
+        """Seconds until the next probe request is allowed"""
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now"""
+        if self.opened_at is None:
+            return True
+        if self.retry_in() <= 0:
+            # Half-open: this request is the probe, the next one waits another reset_timeout
+            self.opened_at = time.monotonic()
+            return True
+        return False
+
+    def record_success(self):
+        if self.opened_at is not None:
+            log.info("Circuit for %s closed, upstream is answering again", self.name)
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                log.warning("Circuit for %s opened after %d failures", self.name, self.failures)
+                metrics.inc("valorant_circuit_opened_total", endpoint=self.name)
+            self.opened_at = time.monotonic()
+
+def _header_number(headers: Mapping[str, str], name: str) -> Optional[float]:
+    """Read a numeric header, or None if missing or malformed"""
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
 
 class ValorantAPI:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, max_connections: int = 20, cache_size: int = 2048, requests_per_minute: int = 30, max_retries: int = 1, match_store: Optional[MatchStore] = None, transport_mode: str = "passthrough", cassette_dir: str = "cassettes", transport=None,
+                 request_timeout: float = 10.0, stale_deadline: float = 0.75, breaker_failures: int = 5, breaker_reset: float = 30.0):
         self.api_key = api_key
         self.base_url = "https://api.henrikdev.xyz/valorant"
         self.headers = {
             "Authorization": api_key
         }
-
-    def get_account(self, name: str, tag: str) -> Optional[Dict[str, Any]]:
-        """Get account information"""
+        # How requests reach the API: one shared connection pool by default,
+        # or record/replay against a cassette directory (see transport.py)
+        self.transport = transport or make_transport(transport_mode, self.headers, cassette_dir, max_connections, request_timeout)
+        self.cache = ResponseCache(max_entries=cache_size)
+        # Requests currently on the wire, so identical lookups can share them
+        self._inflight: Dict[Tuple, "asyncio.Future"] = {}
+        self.coalesced_requests = 0
+        # Requests actually sent upstream (retries included)
+        self.upstream_requests = 0
+        self.scheduler = RateLimitScheduler(requests_per_minute)
+        self.max_retries = max_retries
+        # Optional durable store so finished matches survive restarts
+        self.match_store = match_store
+        # Seconds to wait for a refresh before serving an expired cached copy
+        self.stale_deadline = stale_deadline
+        self.breaker_failures = breaker_failures
+        self.breaker_reset = breaker_reset
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        # Refreshes still running after their caller was answered from a stale copy
+        self._refreshes: set = set()
+
+        metrics.gauge("valorant_cache_entries", lambda: self.cache.stats()["entries"], "Responses held in the in-memory cache")
+        metrics.gauge("valorant_rate_limit_tokens", lambda: self.scheduler.stats()["tokens"], "Requests the token bucket can send right now")
+        metrics.gauge("valorant_rate_limit_queued", lambda: self.scheduler.stats()["queued"], "Requests waiting for a token")
+        metrics.gauge(
+            "valorant_circuit_open",
+            lambda: {(("endpoint", name),): int(breaker.is_open) for name, breaker in self._breakers.items()},
+            "Whether requests to an endpoint are being short-circuited"
+        )
+
+    async def close(self):
+        """Stop background refreshes, close the transport (shared HTTP session) and the match store"""
+        for task in list(self._refreshes):
+            task.cancel()
+        await self.transport.close()
+        if self.match_store is not None:
+            await self._run_blocking(self.match_store.close)
+
+    @staticmethod
+    async def _run_blocking(func, *args):
+        """Run blocking (disk) work in the default executor"""
+        with tracer.span(f"store.{func.__name__}"):
+            return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    @staticmethod
+    @contextmanager
+    def priority(lane: int):
+        """Send every request made inside this block in the given priority lane"""
+        token = request_priority.set(lane)
+        try:
+            yield
+        finally:
+            request_priority.reset(token)
+
+    @staticmethod
+    @contextmanager
+    def track_staleness():
+        """Collect the store times (unix) of the stale documents served inside this block"""
+        reads: List[float] = []
+        token = stale_reads.set(reads)
+        try:
+            yield reads
+        finally:
+            stale_reads.reset(token)
+
+    def _breaker(self, endpoint: str) -> CircuitBreaker:
+        """Circuit breaker of an endpoint label, created on first use"""
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            breaker = self._breakers[endpoint] = CircuitBreaker(endpoint, self.breaker_failures, self.breaker_reset)
+        return breaker
+
+    def _endpoint_label(self, url: str) -> str:
+        """Metrics label of a request, e.g. "v2/mmr" """
+        path = url[len(self.base_url):].strip("/") if url.startswith(self.base_url) else url
+        return "/".join(path.split("/")[:2])
+
+    async def _get(self, url: str, params: Optional[Dict[str, Any]] = None) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """Perform a rate-limited GET request and return (status code, decoded JSON or None)
+
+        Raises UpstreamUnavailable without sending anything while the endpoint's circuit is open.
+        """
+        endpoint = self._endpoint_label(url)
+        breaker = self._breaker(endpoint)
+        if not breaker.allow():
+            metrics.inc("valorant_upstream_requests_total", endpoint=endpoint, status="circuit_open")
+            raise UpstreamUnavailable(f"{endpoint} is not responding, retrying in {breaker.retry_in():.0f}s")
+        # Replayed responses don't count against the real rate limit
+        rate_limited = self.transport.rate_limited
+        for attempt in range(self.max_retries + 1):
+            lane = request_priority.get()
+            queued_at = time.monotonic()
+            if rate_limited:
+                await self.scheduler.acquire(lane)
+            metrics.observe("valorant_queue_wait_seconds", time.monotonic() - queued_at, lane=LANE_NAMES.get(lane, lane))
+
+            self.upstream_requests += 1
+            if attempt:
+                metrics.inc("valorant_upstream_retries_total", endpoint=endpoint)
+            started = time.monotonic()
+            with tracer.span("http.get", endpoint=endpoint, attempt=attempt, queue_wait_ms=round((started - queued_at) * 1000, 1)) as span:
+                try:
+                    status, headers, body = await self.transport.fetch(url, params)
+                except Exception:
+                    # Timeouts and connection errors count against the endpoint's circuit
+                    breaker.record_failure()
+                    metrics.inc("valorant_upstream_requests_total", endpoint=endpoint, status="error")
+                    raise
+                finally:
+                    metrics.observe("valorant_upstream_duration_seconds", time.monotonic() - started, endpoint=endpoint)
+                span.set(status=status, bytes=len(body))
+            if rate_limited:
+                self.scheduler.update(status, headers)
+            if status >= 500:
+                breaker.record_failure()
+            elif status != 429:
+                breaker.record_success()
+            metrics.inc("valorant_upstream_requests_total", endpoint=endpoint, status=status)
+            metrics.inc("valorant_upstream_bytes_total", len(body), endpoint=endpoint)
+
+            with tracer.span("json.decode", bytes=len(body)):
+                try:
+                    data = json.loads(body) if body else None
+                except ValueError:
+                    data = None
+
+            # A 429 pauses the scheduler until Retry-After, so just queue again
+            if status != 429 or attempt == self.max_retries:
+                break
+        return status, data
+
+    @staticmethod
+    def _cache_key(endpoint: str, region: str = "", name: str = "", tag: str = "", params: Optional[Dict[str, Any]] = None) -> Tuple:
+        """Build a cache key; Riot IDs are case-insensitive"""
+        return (endpoint, region.lower(), name.lower(), tag.lower(), tuple(sorted((params or {}).items())))
+
+    async def _fetch(self, endpoint: str, url: str, key: Tuple, params: Optional[Dict[str, Any]] = None,
+                     transform: Optional[Callable] = None, fresh: bool = False) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """GET url through the response cache (stale-while-revalidate)
+
+        With an expired copy in the cache, an interactive request gives upstream
+        stale_deadline seconds (none while its circuit is open) before the copy is
+        served instead; the refresh then finishes in the background and updates
+        the cache. Other lanes queue behind the lane reserves, so they (and fresh
+        requests) wait for the refresh and only fall back to the copy if it fails.
+        """
+        with metrics.timer("valorant_api_call_duration_seconds", endpoint=endpoint), tracer.span(f"api.{endpoint}") as span:
+            cached = self.cache.get(key)
+            if cached is not None:
+                metrics.inc("valorant_cache_lookups_total", endpoint=endpoint, result="hit")
+                span.set(cache="hit")
+                return 200, cached
+
+            stale = self.cache.get_stale(key)
+            if stale is None:
+                metrics.inc("valorant_cache_lookups_total", endpoint=endpoint, result="miss")
+                span.set(cache="miss")
+                return await self._load(endpoint, url, key, params, transform)
+
+            refresh = asyncio.ensure_future(self._load(endpoint, url, key, params, transform))
+            self._track_refresh(refresh)
+            if fresh or request_priority.get() != PRIORITY_INTERACTIVE:
+                deadline = None
+            elif self._breaker(self._endpoint_label(url)).is_open:
+                deadline = 0
+            else:
+                deadline = self.stale_deadline
+            done, _ = await asyncio.wait({refresh}, timeout=deadline)
+            if refresh in done and not refresh.cancelled() and refresh.exception() is None:
+                status, data = refresh.result()
+                # Client errors (e.g. a renamed account) are real answers; outages are not
+                if status < 500 and status != 429:
+                    metrics.inc("valorant_cache_lookups_total", endpoint=endpoint, result="miss")
+                    span.set(cache="miss")
+                    return status, data
+
+            value, stored_at = stale
+            metrics.inc("valorant_cache_lookups_total", endpoint=endpoint, result="stale")
+            span.set(cache="stale", age=round(time.time() - stored_at))
+            reads = stale_reads.get()
+            if reads is not None:
+                reads.append(stored_at)
+            return 200, value
+
+    async def _load(self, endpoint: str, url: str, key: Tuple, params: Optional[Dict[str, Any]] = None, transform: Optional[Callable] = None) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """GET url once per key and cache a successful response"""
+        status, data = await self._single_flight(key, url, params=params, transform=transform)
+        # Only cache real data, never errors
+        if status == 200 and data and data.get("status") == 200:
+            self.cache.set(key, data, CACHE_TTLS[endpoint])
+        return status, data
+
+    def _track_refresh(self, task: "asyncio.Future"):
+        """Keep a refresh alive after its caller stopped waiting for it"""
+        self._refreshes.add(task)
+        task.add_done_callback(self._refreshes.discard)
+        # Failures were already logged and counted by _get
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    async def _single_flight(self, key: Tuple, url: str, params: Optional[Dict[str, Any]] = None, transform: Optional[Callable] = None) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """GET url once per key; concurrent callers await the leader's result
+
+        transform is applied once by the leader to a successful response
+        before it is shared, so followers and the cache see the same object.
+        """
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced_requests += 1
+            metrics.inc("valorant_coalesced_requests_total")
+            # Shield so a cancelled follower doesn't cancel the shared request
+            with tracer.span("api.coalesced"):
+                return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        # Mark the result as retrieved even if nobody else was waiting
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            status, data = await self._get(url, params=params)
+            if transform is not None and status == 200 and isinstance(data, dict):
+                data = transform(data)
+            result = (status, data)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    def invalidate_player(self, region: str, name: str, tag: str, endpoints: Tuple[str, ...] = ("mmr", "matches")) -> int:
+        """Expire a player's cached documents, e.g. once a new match has finished
+
+        The old documents stay available as stale copies in case upstream is down.
+        """
+        player = (region.lower(), name.lower(), tag.lower())
+        return self.cache.expire(lambda key: key[0] in endpoints and key[1:4] == player)
+
+    async def _store_match_bodies(self, matches: List[MatchSummary]):
+        """Keep each match by matchid in memory forever and write new ones to the match store"""
+        new_matches = []
+        for match in matches:
+            key = self._cache_key("match", name=match.match_id)
+            if match.match_id and key not in self.cache:
+                self.cache.set(key, match, CACHE_TTLS["match"])
+                new_matches.append(match.to_payload())
+
+        if new_matches and self.match_store is not None:
+            await self._run_blocking(self.match_store.put_many, new_matches)
+
+    async def get_account(self, name: str, tag: str) -> Optional[Dict[str, Any]]:
+        """Get account information
+
+        A 404 returns the error document (status 404) so callers can tell an
+        unknown player from an outage, which returns None.
+        """
         url = f"{self.base_url}/v1/account/{name}/{tag}"
-        print(f"DEBUG: Getting account from: {url}")
-        response = requests.get(url, headers=self.headers)
+        log.debug("Getting account from: %s", url)
+        status, data = await self._fetch("account", url, self._cache_key("account", name=name, tag=tag))
 
-        print(f"DEBUG: Account API response status: {response.status_code}")
+        log.debug("Account API response status: %s", status)
 
-        if response.status_code == 200:
-            return response.json()
-        else:
-            try:
-                error_data = response.json()
-                print(f"DEBUG: Account API error: {error_data}")
-            except:
-                print(f"DEBUG: Account API error (no JSON): {response.text}")
+        if status == 200:
+            return data
+        log.debug("Account API error: %s", data)
 
+        if status == 404:
+            return data or {"status": 404}
         return None
 
-    def get_mmr(self, region: str, name: str, tag: str) -> Optional[Dict[str, Any]]:
-        """Get rank and MMR information"""
+    async def get_mmr(self, region: str, name: str, tag: str, fresh: bool = False) -> Optional[Dict[str, Any]]:
+        """Get rank and MMR information; fresh waits for upstream instead of serving an expired copy"""
         url = f"{self.base_url}/v2/mmr/{region}/{name}/{tag}"
-        response = requests.get(url, headers=self.headers)
+        status, data = await self._fetch("mmr", url, self._cache_key("mmr", region, name, tag), fresh=fresh)
+
+        if status == 200:
+            return data
+        return None
+
+    async def get_mmr_history(self, region: str, name: str, tag: str) -> Optional[Dict[str, Any]]:
+        """Get RR change history for recent competitive matches"""
+        url = f"{self.base_url}/v1/mmr-history/{region}/{name}/{tag}"
+        status, data = await self._fetch("mmr_history", url, self._cache_key("mmr_history", region, name, tag))
 
-        if response.status_code == 200:
-            return response.json()
+        if status == 200:
+            return data
+        log.debug("MMR history API error: %s", status)
         return None
 
-    def get_match_history(self, region: str, name: str, tag: str, mode: str = "competitive", size: int = 5) -> Optional[Dict[str, Any]]:
-        """Get recent match history"""
-        url = f"{self.base_url}/v3/matches/{region}/{name}/{tag}?mode={mode}&size={size}"
-        response = requests.get(url, headers=self.headers)
+    async def get_rr_history(self, region: str, name: str, tag: str) -> Optional[RRHistory]:
+        """Get a player's RR change per match, merging new mmr-history entries into the stored series
+
+        Returns None only if there is neither stored nor upstream history.
+        """
+        key = self._cache_key("rr_history", region, name, tag)
+        series = self.cache.get(key)
+        if series is None:
+            series = RRHistory()
+            if self.match_store is not None:
+                rows = await self._run_blocking(self.match_store.rr_changes, region, name, tag, RR_HISTORY_LIMIT)
+                series.merge([RRChange.from_row(row) for row in rows])
+            self.cache.set(key, series, CACHE_TTLS["rr_history"])
+
+        # Within the mmr-history TTL this is a cache hit and merges nothing new
+        history = await self.get_mmr_history(region, name, tag)
+        if history and history.get("status") == 200:
+            added = series.merge([RRChange.from_payload(entry) for entry in history.get("data", [])])
+            if added and self.match_store is not None:
+                await self._run_blocking(
+                    self.match_store.put_rr_changes, region, name, tag, [change.to_row() for change in added]
+                )
+        elif not len(series):
+            return None
+        return series
+
+    async def get_match_history(self, region: str, name: str, tag: str, mode: str = "competitive", size: int = 5) -> Optional[Dict[str, Any]]:
+        """Get recent match history; "data" holds MatchSummary objects"""
+        url = f"{self.base_url}/v3/matches/{region}/{name}/{tag}"
+        params = {"mode": mode, "size": size}
+        status, data = await self._fetch(
+            "matches", url, self._cache_key("matches", region, name, tag, params),
+            params=params, transform=summarize_match_list
+        )
+
+        if status == 200:
+            if data and data.get("status") == 200:
+                await self._store_match_bodies(data.get("data", []))
+            return data
+        return None
 
-        if response.status_code == 200:
-            return response.json()
+    async def get_stored_matches(self, puuid: str, mode: str = "competitive", season: Optional[str] = None, limit: int = 10) -> List[MatchSummary]:
+        """Get a player's matches from the local match store, newest first"""
+        if self.match_store is None:
+            return []
+        payloads = await self._run_blocking(self.match_store.recent_for_player, puuid, mode, season, limit)
+
+        matches = []
+        for payload in payloads:
+            # Reuse the in-memory summary when the match is already cached
+            key = self._cache_key("match", name=payload.get("metadata", {}).get("matchid", ""))
+            match = self.cache.get(key)
+            if match is None:
+                match = MatchSummary.from_payload(payload)
+                self.cache.set(key, match, CACHE_TTLS["match"])
+            matches.append(match)
+        return matches
+
+
+    @staticmethod
+    def _find_puuid(matches: List[MatchSummary], name: str, tag: str) -> Optional[str]:
+        """Find a player's puuid in a list of matches"""
+        for match in matches:
+            player = match.find_player(name, tag)
+            if player:
+                return player.puuid
         return None
 
+    async def _full_sync(self, region: str, name: str, tag: str, mode: str, size: int) -> Optional[Dict[str, Any]]:
+        """Download the last `size` matches and remember the newest one"""
+        matches = await self.get_match_history(region, name, tag, mode=mode, size=size)
+        if not matches or matches.get("status") != 200 or not matches.get("data"):
+            return matches
+
+        puuid = self._find_puuid(matches["data"], name, tag)
+        if puuid:
+            newest = matches["data"][0]
+            await self._run_blocking(
+                self.match_store.set_sync_state, region, name, tag, mode,
+                puuid, newest.match_id, newest.game_start
+            )
+        return matches
+
+    async def sync_match_history(self, region: str, name: str, tag: str, mode: str = "competitive", size: int = 10) -> Optional[Dict[str, Any]]:
+        """Get recent matches, downloading only matches newer than the last seen one"""
+        # mmr-history only lists competitive games, so other modes can't be probed
+        if self.match_store is None or mode != "competitive":
+            return await self.get_match_history(region, name, tag, mode=mode, size=size)
+
+        state = await self._run_blocking(self.match_store.get_sync_state, region, name, tag, mode)
+        if state is None:
+            log.debug("No sync state for %s#%s, downloading %d matches", name, tag, size)
+            return await self._full_sync(region, name, tag, mode, size)
+
+        # Cheap probe: which competitive matches exist upstream?
+        history = await self.get_mmr_history(region, name, tag)
+        if not history or history.get("status") != 200:
+            return await self._full_sync(region, name, tag, mode, size)
+
+        new_ids = []
+        for entry in history.get("data", []):
+            if entry.get("match_id") == state["newest_match"]:
+                break
+            new_ids.append(entry.get("match_id"))
+        else:
+            if history.get("data"):
+                # Newest known match fell out of the probe window
+                return await self._full_sync(region, name, tag, mode, size)
+
+        if new_ids:
+            log.debug("%d new match(es) for %s#%s", len(new_ids), name, tag)
+            result = await self._full_sync(region, name, tag, mode, min(len(new_ids), size))
+            if not result or result.get("status") != 200:
+                return result
+        else:
+            # Nothing new upstream: the whole list comes from the match store
+            metrics.inc("valorant_cache_lookups_total", endpoint="matches", result="store")
+
+        stored = await self.get_stored_matches(state["puuid"], mode, limit=size)
+        return {"status": 200, "data": stored}
 
-    def get_all_act_matches(self, region: str, name: str, tag: str, mode: str = "competitive") -> Optional[Dict[str, Any]]:
+    async def get_all_act_matches(self, region: str, name: str, tag: str, mode: str = "competitive") -> Optional[List[MatchSummary]]:
         """Get last 10 matches from current act"""
-        print(f"DEBUG: Fetching last 10 matches from current act")
+        log.debug("Fetching last 10 matches from current act")
 
-        # Get matches from v3 API
-        matches = self.get_match_history(region, name, tag, mode=mode, size=10)
+        # Get matches, only downloading the ones we haven't stored yet
+        matches = await self.sync_match_history(region, name, tag, mode=mode, size=10)
 
         if not matches or matches.get("status") != 200:
-            print(f"DEBUG: v3 API failed")
+            log.debug("v3 API failed")
             return None
 
         # Filter by current act
-        filtered = self.filter_matches_by_act(matches)
-        filtered_count = len(filtered.get('data', []))
-        print(f"DEBUG: v3 API returned {filtered_count} matches in current act")
+        filtered = self.filter_matches_by_act(matches.get("data", []))
+        log.debug("v3 API returned %d matches in current act", len(filtered))
 
         return filtered
 
 
-    def filter_matches_by_act(self, matches_data: Dict[str, Any]) -> Dict[str, Any]:
+    def filter_matches_by_act(self, matches: List[MatchSummary]) -> List[MatchSummary]:
         """Filter matches to only include current act"""
-        if not matches_data or "data" not in matches_data:
-            return matches_data
-
-        # Get the most recent match's season info
-        if not matches_data["data"]:
-            return matches_data
-
-        current_season = matches_data["data"][0].get("metadata", {}).get("season", {}).get("short", "")
+        if not matches:
+            return []
 
-        # Filter matches that belong to the current season
-        filtered_matches = []
-        for match in matches_data["data"]:
-            match_season = match.get("metadata", {}).get("season", {}).get("short", "")
-            if match_season == current_season:
-                filtered_matches.append(match)
+        # The most recent match decides the current season
+        current_season = matches[0].season
+        return [match for match in matches if match.season == current_season]
 
-        # Create new data structure with filtered matches
-        filtered_data = matches_data.copy()
-        filtered_data["data"] = filtered_matches
-
-        return filtered_data
-
-    def get_current_season_name(self, region: str, name: str, tag: str) -> str:
-        """Get current season name from MMR API and convert to readable format"""
+    @staticmethod
+    def season_name_from_mmr(mmr_data: Optional[Dict[str, Any]]) -> str:
+        """Get current season name from an MMR document and convert to readable format"""
         try:
-            mmr_data = self.get_mmr(region, name, tag)
             if mmr_data and mmr_data.get("status") == 200:
                 by_season = mmr_data.get("data", {}).get("by_season", {})
                 if by_season:
@@ -101,25 +753,105 @@ class ValorantAPI:
                     season_keys = list(by_season.keys())
                     if season_keys:
                         current_season = season_keys[-1]
-                        print(f"DEBUG: Current season from MMR API: {current_season}")
+                        log.debug("Current season from MMR API: %s", current_season)
 
                         # Convert e10aX to V25AX (Episode 10 was renamed to V25)
                         if current_season.startswith("e10a"):
                             act_number = current_season[4:]  # Get the act number after "e10a"
                             converted = f"V25A{act_number}"
-                            print(f"DEBUG: Converted {current_season} to {converted}")
+                            log.debug("Converted %s to %s", current_season, converted)
                             return converted
 
                         return current_season
         except Exception as e:
-            print(f"DEBUG: Error getting season name: {e}")
+            log.warning("Error getting season name: %s", e)
 
         return "Unknown Act"
 
-
-    def calculate_stats(self, matches_data: Dict[str, Any], name: str, tag: str) -> Dict[str, float]:
+    async def get_current_season_name(self, region: str, name: str, tag: str) -> str:
+        """Get current season name from MMR API and convert to readable format"""
+        return self.season_name_from_mmr(await self.get_mmr(region, name, tag))
+
+    async def get_player_bundle(self, region: str, name: str, tag: str, include: Tuple[str, ...] = ("account", "mmr", "matches"),
+                                essential: Optional[Tuple[str, ...]] = None, budget: Optional[float] = None) -> PlayerBundle:
+        """Fetch the documents a command declares, concurrently and each endpoint only once
+
+        include may contain "account", "mmr", "mmr_history", "rr_history"
+        and "matches" (current-act matches). The season name is derived from the MMR
+        document instead of fetching it a second time.
+
+        With a budget (seconds), the bundle is returned once the essential parts
+        (default: all) have arrived and the budget is spent; parts still loading
+        are left in bundle.pending until complete_bundle() is awaited.
+        """
+        fetchers = {
+            "account": lambda: self.get_account(name, tag),
+            "mmr": lambda: self.get_mmr(region, name, tag),
+            "mmr_history": lambda: self.get_mmr_history(region, name, tag),
+            "rr_history": lambda: self.get_rr_history(region, name, tag),
+            "matches": lambda: self.get_all_act_matches(region, name, tag, mode="competitive"),
+        }
+        parts = [part for part in dict.fromkeys(include) if part in fetchers]
+        bundle = PlayerBundle()
+        loop = asyncio.get_running_loop()
+        deadline = None if budget is None else loop.time() + budget
+        with tracer.span("api.bundle", parts=parts) as span, self.track_staleness() as stale:
+            # Parts left pending keep adding their stale reads to this list
+            bundle._stale_reads = stale
+            tasks = {part: asyncio.ensure_future(fetchers[part]()) for part in parts}
+            for task in tasks.values():
+                # Pending parts may never be awaited if the command gives up on them
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            try:
+                required = [tasks[part] for part in (parts if essential is None else essential) if part in tasks]
+                if required:
+                    await asyncio.wait(required)
+                rest = [task for task in tasks.values() if not task.done()]
+                if rest:
+                    await asyncio.wait(rest, timeout=None if deadline is None else max(0.0, deadline - loop.time()))
+            except asyncio.CancelledError:
+                for task in tasks.values():
+                    task.cancel()
+                raise
+            self._fill_bundle(bundle, tasks, name, tag)
+            if bundle.pending:
+                span.set(pending=list(bundle.pending))
+        return bundle
+
+    async def complete_bundle(self, bundle: PlayerBundle) -> PlayerBundle:
+        """Wait for the parts a budgeted get_player_bundle() left pending and fill them in"""
+        if bundle.pending:
+            pending = bundle.pending
+            await asyncio.wait(pending.values())
+            self._fill_bundle(bundle, pending)
+        return bundle
+
+    def _fill_bundle(self, bundle: PlayerBundle, tasks: Dict[str, "asyncio.Future"], name: str = "", tag: str = ""):
+        """Copy finished parts into the bundle; unfinished ones go to bundle.pending"""
+        errors = list(bundle.errors)
+        bundle.pending = {}
+        for part, task in tasks.items():
+            if not task.done():
+                bundle.pending[part] = task
+                continue
+            try:
+                result = task.result()
+            except Exception as e:
+                if name:
+                    log.warning("Error fetching %s for %s#%s: %s", part, name, tag, e)
+                else:
+                    log.warning("Error fetching %s: %s", part, e)
+                errors.append(part)
+                result = None
+            setattr(bundle, part, result)
+        bundle.errors = tuple(errors)
+        bundle.stale_as_of = min(bundle._stale_reads) if bundle._stale_reads else None
+        if bundle.mmr is not None:
+            bundle.season_name = self.season_name_from_mmr(bundle.mmr)
+
+    def calculate_stats(self, matches: List[MatchSummary], name: str, tag: str, puuid: Optional[str] = None) -> Dict[str, float]:
         """Calculate overall stats from match history"""
-        if not matches_data or "data" not in matches_data:
+        if not matches:
             return {}
 
         total_kills = 0
@@ -134,82 +866,33 @@ class ValorantAPI:
         wins = 0
         total_matches = 0
 
-        print(f"DEBUG: Calculating stats for {len(matches_data['data'])} matches")
-
-        for match in matches_data["data"]:
-            players = match.get("players", {}).get("all_players", [])
+        log.debug("Calculating stats for %d matches", len(matches))
 
+        for match in matches:
             # Find player in match
-            for player in players:
-                player_name = player.get("name", "").lower()
-                player_tag = player.get("tag", "").lower()
-
-                if player_name == name.lower() and player_tag == tag.lower():
-                    stats = player.get("stats", {})
-
-                    total_kills += stats.get("kills", 0)
-                    total_deaths += stats.get("deaths", 0)
-                    total_assists += stats.get("assists", 0)
-
-                    # Damage dealt handling - try multiple possible structures
-                    damage_data = stats.get("damage", {})
-                    match_damage = 0
-
-                    if isinstance(damage_data, dict):
-                        # Try "made" field
-                        match_damage = damage_data.get("made", 0)
-                        # If made is 0, try "damage" field
-                        if match_damage == 0:
-                            match_damage = damage_data.get("damage", 0)
-                    elif isinstance(damage_data, (int, float)):
-                        match_damage = damage_data
-
-                    # If still 0, try alternative locations
-                    if match_damage == 0:
-                        match_damage = stats.get("damage_made", 0)
-                        if match_damage == 0:
-                            # Try getting from damage_delta or other fields
-                            damage_delta_val = player.get("damage_made", 0)
-                            if damage_delta_val > 0:
-                                match_damage = damage_delta_val
-
-                    total_damage += match_damage
-
-                    # Damage received handling
-                    match_damage_received = player.get("damage_received", 0)
-                    if match_damage_received == 0:
-                        # Try alternative location
-                        damage_recv_data = stats.get("damage", {})
-                        if isinstance(damage_recv_data, dict):
-                            match_damage_received = damage_recv_data.get("received", 0)
-
-                    total_damage_received += match_damage_received
-
-                    # Count rounds played in this match
-                    rounds_played = match.get("metadata", {}).get("rounds_played", 0)
-                    total_rounds += rounds_played
-
-                    # Debug first match to see structure
-                    if total_matches == 0 and match_damage == 0:
-                        print(f"DEBUG: First match damage structure:")
-                        print(f"  stats.damage: {stats.get('damage')}")
-                        print(f"  stats keys: {list(stats.keys())}")
-                        print(f"  player keys: {list(player.keys())}")
-
-                    # Headshot stats
-                    total_headshots += stats.get("headshots", 0)
-                    total_bodyshots += stats.get("bodyshots", 0)
-                    total_legshots += stats.get("legshots", 0)
-
-                    # Check if won
-                    player_team = player.get("team", "").lower()
-                    if player_team == "red" and match.get("teams", {}).get("red", {}).get("has_won", False):
-                        wins += 1
-                    elif player_team == "blue" and match.get("teams", {}).get("blue", {}).get("has_won", False):
-                        wins += 1
-
-                    total_matches += 1
-                    break
+            player = match.find_player(name, tag, puuid)
+            if not player:
+                continue
+
+            total_kills += player.kills
+            total_deaths += player.deaths
+            total_assists += player.assists
+            total_damage += player.damage_made
+            total_damage_received += player.damage_received
+
+            # Count rounds played in this match
+            total_rounds += match.rounds_played
+
+            # Headshot stats
+            total_headshots += player.headshots
+            total_bodyshots += player.bodyshots
+            total_legshots += player.legshots
+
+            # Check if won
+            if player.team in ("red", "blue") and match.won(player.team):
+                wins += 1
+
+            total_matches += 1
 
         # Calculate averages
         kda = ((total_kills + total_assists) / max(total_deaths, 1))
@@ -221,7 +904,10 @@ class ValorantAPI:
         hs_percentage = (total_headshots / max(total_shots, 1)) * 100
         winrate = (wins / max(total_matches, 1)) * 100
 
-        print(f"DEBUG: Stats calculated - Total Damage: {total_damage}, Received: {total_damage_received}, Matches: {total_matches}, Rounds: {total_rounds}, ADR: {adr}, DDΔ: {damage_delta}")
+        log.debug(
+            "Stats calculated - Total Damage: %s, Received: %s, Matches: %s, Rounds: %s, ADR: %s, DDΔ: %s",
+            total_damage, total_damage_received, total_matches, total_rounds, adr, damage_delta
+        )
 
         return {
             "kda": round(kda, 2),
@@ -234,4 +920,3 @@ class ValorantAPI:
             "assists": total_assists,
             "matches": total_matches
         }
-